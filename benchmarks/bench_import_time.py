@@ -0,0 +1,84 @@
+"""
+Benchmark: startup (import) cost of a projection-only run.
+
+Runs `python -X importtime` on the imports of a projection-only run (main and
+the implemented indicator modules) in fresh interpreters, and reports the
+median total import time and the heaviest packages. Fails if a
+plotting or fitting library (matplotlib, sklearn) is loaded: these must only
+be imported once a figure or fit is requested.
+
+Run from the project root:
+    python -m benchmarks.bench_import_time [repeats]
+"""
+
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+INDICATORS = [
+    "Amount_Of_Pelts_Produced_Per_MS", "Amount_Fur_Companies_Per_MS", "ID28", "ID19", "ID25", "ID26", "ID27"
+]
+FORBIDDEN = ["matplotlib", "sklearn"]
+
+SNIPPET = "import importlib, main\n" + "".join(
+    f"importlib.import_module('indicators.{indicator}')\n" for indicator in INDICATORS
+)
+
+# "import time:  self [us] | cumulative | imported package", nesting shown by indentation
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times():
+    """
+    Total import time (seconds), cumulative import time of every top-level
+    package (including its submodules) and the names of all imported modules
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    total = 0.0
+    packages = {}
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match is None:
+            continue
+        _, cumulative, indent, name = match.groups()
+        modules.append(name)
+        if len(indent) == 1:
+            total += int(cumulative) / 1e6
+        if "." not in name:
+            packages[name] = int(cumulative) / 1e6
+    return total, packages, modules
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    runs = [import_times() for _ in range(repeats)]
+
+    totals = [total for total, _, _ in runs]
+    print(f"[INFO] Projection-only imports: {statistics.median(totals):.3f}s (median of {repeats} runs)")
+
+    packages = defaultdict(list)
+    for _, run_packages, _ in runs:
+        for name, seconds in run_packages.items():
+            packages[name].append(seconds)
+    heaviest = sorted(packages.items(), key=lambda item: -statistics.median(item[1]))[:10]
+    for name, seconds in heaviest:
+        print(f"[INFO]   {name:<35} {statistics.median(seconds):.3f}s")
+
+    loaded = sorted({name.split(".")[0] for name in runs[0][2]} & set(FORBIDDEN))
+    if loaded:
+        print(f"[WARNING] Loaded by a projection-only run: {', '.join(loaded)}")
+        sys.exit(1)
+    print(f"[INFO] Not loaded: {', '.join(FORBIDDEN)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Benchmark suite: projection and figure stages of every implemented S1 indicator.
+
+For each scale of benchmarks.synthetic_input.SCALES (small, EU-27 and the
+10x / 100x stress sizes) a seeded synthetic input is generated and every
+indicator is run in dependency order through the worker entry point
+(scheduler.run_indicator_projection, including prepare_history where the
+module has one). Three stages are timed separately per indicator:
+    projection     run_projection_S1 (best of --repeat runs)
+    figure_build   make_figures_S1 (FigureJob specs)
+    figure_render  drawing the jobs in this process (at most --max-figures)
+With --trace-memory, one more projection run per indicator is traced with
+tracemalloc (run_metrics.measure, as main.py does with trace_memory = True)
+and its peak memory is printed; it is not stored, and the timed runs are not
+traced.
+
+Results are appended, with the git commit, to benchmarks/results/
+bench_projections.csv so runs can be compared across commits; --compare REF
+prints the ratio to the latest stored run of commit REF.
+
+Run from the project root:
+    python -m benchmarks.bench_projections [--scales small eu27 x10 x100] [--compare REF] [--trace-memory]
+"""
+
+import argparse
+import importlib
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import projection_registry
+from benchmarks.synthetic_input import SCALES, make_input
+from figure_jobs import apply_theme, render_figure
+from run_metrics import measure
+from scheduler import build_dependency_graph, run_indicator_projection, topological_order
+from vocabulary import categorize
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_FILE = PROJECT_ROOT / "benchmarks" / "results" / "bench_projections.csv"
+
+INDICATORS = [
+    "Amount_Of_Pelts_Produced_Per_MS", "Amount_Fur_Companies_Per_MS", "ID28", "ID19", "ID25", "ID26", "ID27"
+]
+
+
+def git_commit():
+    """Short hash of HEAD ("+" appended if the tree has uncommitted changes), or "unknown" """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("+" if dirty else "")
+
+
+def time_call(func, *args, repeat=3, **kwargs):
+    """Best wall-clock time of several calls, and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def project(indicator, mod, sheet, results, vocabulary=None):
+    """One run of an indicator's projection with its upstream results, as in a worker process"""
+    history = mod.prepare_history(sheet) if hasattr(mod, "prepare_history") else None
+    upstream = {up: results[up] for up in getattr(mod, "UPSTREAM", []) if up in results}
+    return run_indicator_projection(indicator, "S1", sheet, upstream, None, history, vocabulary)
+
+
+def warm_up_figures():
+    """Import matplotlib and apply the Theme, so the first timed figure does not pay for it"""
+    import matplotlib.pyplot  # noqa: F401
+
+    apply_theme()
+
+
+def bench_scale(scale, seed=42, repeat=3, max_figures=50, figures=True, trace_memory=False):
+    """Stage timings of every indicator at one scale, one row per indicator and stage"""
+    # Key columns as shared Categoricals, as loaded by InputStore
+    vocabulary, sheets = categorize(make_input(**SCALES[scale], seed=seed))
+    print(f"[INFO] {scale}: {', '.join(f'{sheet} {len(df)}' for sheet, df in sheets.items())} input rows")
+    results = {}
+    rows = []
+
+    with tempfile.TemporaryDirectory() as figures_dir:
+        for indicator in topological_order(build_dependency_graph(INDICATORS)):
+            mod = importlib.import_module(f"indicators.{indicator}")
+            sheet = sheets.get(indicator, pd.DataFrame())
+
+            seconds, df_proj = time_call(project, indicator, mod, sheet, results, vocabulary, repeat=repeat)
+            results[indicator] = df_proj
+            rows.append({"Indicator": indicator, "Stage": "projection", "Seconds": seconds, "Items": len(df_proj)})
+
+            if figures:
+                seconds, jobs = time_call(mod.make_figures_S1, df_proj, repeat=1)
+                jobs = jobs or []
+                rows.append({"Indicator": indicator, "Stage": "figure_build", "Seconds": seconds, "Items": len(jobs)})
+                to_render = jobs[:max_figures]
+                start = time.perf_counter()
+                for job in to_render:
+                    render_figure(job, figures_dir)
+                rows.append({
+                    "Indicator": indicator, "Stage": "figure_render",
+                    "Seconds": time.perf_counter() - start, "Items": len(to_render)
+                })
+
+            timings = ", ".join(f"{row['Stage']} {row['Seconds']:.3f}s" for row in rows if row["Indicator"] == indicator)
+            if trace_memory:
+                _, metrics = measure(project, indicator, mod, sheet, results, vocabulary, trace_memory=True)
+                timings += f", peak memory {metrics['Peak Memory (MB)']:.1f} MB"
+            print(f"[INFO]   {indicator:<33} {timings}")
+
+    projection_registry.clear()
+    df = pd.DataFrame(rows)
+    df.insert(0, "Scale", scale)
+    return df
+
+
+def store(df, seed):
+    """Append a run to RESULTS_FILE with the commit and environment it was measured on"""
+    df = df.assign(
+        Commit=git_commit(),
+        Timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        Seed=seed,
+        Python=platform.python_version(),
+        Numpy=np.__version__,
+        Pandas=pd.__version__,
+    )
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(RESULTS_FILE, mode="a", header=not RESULTS_FILE.exists(), index=False)
+    print(f"[INFO] Results appended to {RESULTS_FILE} (commit {df['Commit'].iloc[0]})")
+
+
+def compare(df, ref):
+    """Print the timings of this run against the latest stored run of commit ref"""
+    if not RESULTS_FILE.exists():
+        print(f"[WARNING] No stored results in {RESULTS_FILE}")
+        return
+    stored = pd.read_csv(RESULTS_FILE)
+    stored = stored[stored["Commit"].astype(str).str.startswith(ref)]
+    if stored.empty:
+        print(f"[WARNING] No stored results for commit {ref}")
+        return
+    keys = ["Scale", "Indicator", "Stage"]
+    baseline = stored.sort_values("Timestamp").groupby(keys).last()
+    merged = df.join(baseline[["Seconds", "Items"]], on=keys, rsuffix=" (ref)").dropna(subset=["Seconds (ref)"])
+    # Renders are compared per figure, since --max-figures may differ between runs
+    per_item = merged["Stage"] == "figure_render"
+    current = np.where(per_item, merged["Seconds"] / merged["Items"].clip(lower=1), merged["Seconds"])
+    reference = np.where(per_item, merged["Seconds (ref)"] / merged["Items (ref)"].clip(lower=1), merged["Seconds (ref)"])
+    merged["Ratio"] = current / np.maximum(reference, 1e-9)
+    print(f"[INFO] Compared with commit {ref} (ratio < 1: faster now)")
+    for _, row in merged.iterrows():
+        print(f"[INFO]   {row['Scale']:<6} {row['Indicator']:<33} {row['Stage']:<14} "
+              f"{row['Seconds']:8.3f}s vs {row['Seconds (ref)']:8.3f}s  x{row['Ratio']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the projection and figure stages of the S1 indicators")
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="projection runs per indicator (best is kept)")
+    parser.add_argument("--max-figures", type=int, default=50, help="figures drawn per indicator and scale")
+    parser.add_argument("--no-figures", action="store_true", help="time the projections only")
+    parser.add_argument("--no-store", action="store_true", help=f"do not append to {RESULTS_FILE.name}")
+    parser.add_argument("--compare", metavar="REF", help="commit to compare with")
+    parser.add_argument("--trace-memory", action="store_true", help="print the peak memory of each projection")
+    args = parser.parse_args()
+
+    if not args.no_figures:
+        warm_up_figures()
+
+    df = pd.concat(
+        [
+            bench_scale(scale, args.seed, args.repeat, args.max_figures, not args.no_figures, args.trace_memory)
+            for scale in args.scales
+        ],
+        ignore_index=True
+    )
+    if args.compare:
+        compare(df, args.compare)
+    if not args.no_store:
+        store(df, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark and parity check: batched Monte Carlo sensitivity.
+
+Evaluates the S1 parameters (sensitivity.central_parameters) with the
+batched model and checks that every output series matches the deterministic
+run_projection_S1 of its indicator, then times run_sensitivity() for the
+requested number of draws.
+
+Run from the project root:
+    python -m benchmarks.bench_sensitivity [input.xlsx] [n_draws]
+"""
+
+import importlib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import projection_registry
+from sensitivity import SENSITIVITY_INDICATORS, YEARS, SensitivityModel, central_parameters, run_sensitivity
+from zero_runs import expand_zero_runs
+
+
+def deterministic_projections(sheets):
+    """run_projection_S1 of every sensitivity indicator, in dependency order"""
+    projection_registry.clear()
+    results = {}
+    for indicator in SENSITIVITY_INDICATORS:
+        if indicator not in sheets:
+            continue
+        mod = importlib.import_module(f"indicators.{indicator}")
+        results[indicator] = mod.run_projection_S1(sheets[indicator].copy())
+        projection_registry.publish(indicator, results[indicator])
+    return results
+
+
+def check_parity(model, results):
+    """Compare the central draw of every series with the deterministic projection"""
+    central = model.evaluate(central_parameters())
+    for indicator, values in central.items():
+        series = model.series[indicator]
+        # One row per year, as the sensitivity series hold them
+        projection = expand_zero_runs(results[indicator])
+        keys = [col for col in series.columns if col != "Variable"]
+        for variable in series["Variable"].unique():
+            rows = np.flatnonzero(series["Variable"] == variable)
+            reference = (
+                projection.dropna(subset=[variable])
+                .set_index(keys + ["Year"])[variable].unstack("Year")
+                .reindex(pd.MultiIndex.from_frame(series.iloc[rows][keys].astype(object)))
+                .reindex(columns=YEARS)
+                .to_numpy(dtype=float)
+            )
+            np.testing.assert_allclose(values[0, rows], reference, rtol=1e-9, atol=1e-9)
+        print(f"[INFO] Central draw matches run_projection_S1 for {indicator} ({len(series)} series)")
+
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else "data/input/input.xlsx"
+    n_draws = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    sheets = pd.read_excel(input_file, sheet_name=None)
+
+    check_parity(SensitivityModel(sheets), deterministic_projections(sheets))
+
+    start = time.perf_counter()
+    run_sensitivity(sheets, n_draws, seed=42)
+    print(f"[INFO] {n_draws} draws of all indicators: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
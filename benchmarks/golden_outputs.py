@@ -0,0 +1,191 @@
+"""
+Golden-output parity harness for the S1 projections.
+
+Every implemented run_projection_S1 is run, in dependency order, on fixed
+inputs (seeded synthetic inputs stored with the goldens, so later changes
+to the generator do not move them) and its result is compared with the
+golden Parquet file captured from a trusted version:
+- rows are aligned on their key columns (KEY_COLUMNS), so a change of row
+  order alone is not a difference, and missing or extra rows are listed;
+- numeric columns must match within the tolerance of their column
+  (TOLERANCES, DEFAULT_TOLERANCE), all other columns exactly;
+- dtype changes (e.g. object to category) are reported but not failures.
+Projections stored with zero runs (zero_runs.py) are compared, and
+captured, as the dense rows written to Excel.
+
+Capture goldens (after a deliberate change of results) and check against
+them from the project root:
+    python -m benchmarks.golden_outputs capture
+    python -m benchmarks.golden_outputs [check]
+"""
+
+import importlib
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_projections import INDICATORS, project
+from benchmarks.synthetic_input import SCALES, make_input
+from scheduler import build_dependency_graph, topological_order
+from vocabulary import categorize
+from zero_runs import expand_zero_runs
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden"
+
+# Fixed inputs: (scale, seed) of the synthetic input of every case
+CASES = {
+    "small": ("small", 7),
+    "eu27": ("eu27", 42),
+}
+
+KEY_COLUMNS = ["Country", "Species", "Fur Industry Sector", "Environmental Metric", "Year"]
+
+# (rtol, atol) of numeric columns; the pelt and farm counts are large, the ratios small
+DEFAULT_TOLERANCE = (1e-9, 1e-9)
+TOLERANCES = {
+    "Pelts": (1e-9, 1e-6),
+    "Number of Farms": (1e-9, 1e-6),
+    "Number of jobs": (1e-9, 1e-6),
+}
+
+MAX_REPORTED = 5
+
+
+def run_projections(sheets):
+    """
+    run_projection_S1 of every implemented indicator on the given input
+    sheets, with their key columns as Categoricals (as loaded by InputStore)
+    """
+    vocabulary, sheets = categorize(sheets)
+    results = {}
+    for indicator in topological_order(build_dependency_graph(INDICATORS)):
+        mod = importlib.import_module(f"indicators.{indicator}")
+        results[indicator] = project(indicator, mod, sheets.get(indicator, pd.DataFrame()), results, vocabulary)
+    return results
+
+
+def dense_projections(sheets):
+    """run_projections() with the zero runs expanded, i.e. as written to projected_data.xlsx"""
+    return {indicator: expand_zero_runs(df) for indicator, df in run_projections(sheets).items()}
+
+
+def load_inputs(case):
+    """Input sheets stored with the goldens of a case"""
+    return {path.stem: pd.read_parquet(path) for path in sorted((GOLDEN_DIR / case / "inputs").glob("*.parquet"))}
+
+
+def capture():
+    """Write the inputs and current outputs of every case as goldens"""
+    for case, (scale, seed) in CASES.items():
+        case_dir = GOLDEN_DIR / case
+        if case_dir.exists():
+            shutil.rmtree(case_dir)
+        (case_dir / "inputs").mkdir(parents=True)
+        (case_dir / "outputs").mkdir()
+
+        sheets = make_input(**SCALES[scale], seed=seed)
+        for sheet, df in sheets.items():
+            df.to_parquet(case_dir / "inputs" / f"{sheet}.parquet", index=False)
+        # Project from the stored inputs, exactly as check() will
+        for indicator, df in dense_projections(load_inputs(case)).items():
+            df.to_parquet(case_dir / "outputs" / f"{indicator}.parquet", index=False)
+        print(f"[INFO] Captured goldens of case {case} ({scale}, seed {seed})")
+
+
+def _key_frame(df, keys):
+    """df indexed by its key columns (as text) plus the occurrence of each key"""
+    key_values = df[keys].astype(str) if keys else pd.DataFrame(index=df.index)
+    key_values["_occurrence"] = key_values.groupby(keys).cumcount() if keys else np.arange(len(df))
+    return df.set_index(pd.MultiIndex.from_frame(key_values))
+
+
+def compare_frames(golden, actual):
+    """List of differences between a golden and an actual projection (empty: equivalent)"""
+    problems = []
+    missing = [col for col in golden.columns if col not in actual.columns]
+    extra = [col for col in actual.columns if col not in golden.columns]
+    if missing or extra:
+        problems.append(f"columns missing {missing}, extra {extra}")
+    for col in golden.columns.intersection(actual.columns):
+        if str(golden[col].dtype) != str(actual[col].dtype):
+            print(f"[INFO]     {col}: dtype {golden[col].dtype} -> {actual[col].dtype}")
+
+    keys = [col for col in KEY_COLUMNS if col in golden.columns and col in actual.columns]
+    golden = _key_frame(golden, keys)
+    actual = _key_frame(actual, keys)
+    only_golden = golden.index.difference(actual.index)
+    only_actual = actual.index.difference(golden.index)
+    if len(only_golden):
+        problems.append(f"{len(only_golden)} rows missing, e.g. {list(only_golden[:MAX_REPORTED])}")
+    if len(only_actual):
+        problems.append(f"{len(only_actual)} rows added, e.g. {list(only_actual[:MAX_REPORTED])}")
+
+    common = golden.index.intersection(actual.index)
+    for col in golden.columns.intersection(actual.columns).difference(keys):
+        expected = golden.loc[common, col]
+        observed = actual.loc[common, col]
+        if pd.api.types.is_numeric_dtype(expected) and pd.api.types.is_numeric_dtype(observed):
+            rtol, atol = TOLERANCES.get(col, DEFAULT_TOLERANCE)
+            a = expected.to_numpy(dtype=float)
+            b = observed.to_numpy(dtype=float)
+            bad = ~np.isclose(b, a, rtol=rtol, atol=atol, equal_nan=True)
+            if bad.any():
+                worst = np.nanmax(np.abs(b - a)[bad])
+                problems.append(
+                    f"{col}: {bad.sum()} values differ beyond rtol={rtol:g}, atol={atol:g} "
+                    f"(max abs diff {worst:.3g}), e.g. {list(common[bad][:MAX_REPORTED])}"
+                )
+        else:
+            a = expected.astype(object).where(expected.notna(), None)
+            b = observed.astype(object).where(observed.notna(), None)
+            bad = (a != b).to_numpy()
+            if bad.any():
+                problems.append(f"{col}: {bad.sum()} values differ, e.g. {list(common[bad][:MAX_REPORTED])}")
+    return problems
+
+
+def check():
+    """Compare the current outputs of every case with the goldens; True if all match"""
+    start = time.perf_counter()
+    ok = True
+    for case in CASES:
+        outputs_dir = GOLDEN_DIR / case / "outputs"
+        if not outputs_dir.exists():
+            print(f"[WARNING] No goldens for case {case}, run: python -m benchmarks.golden_outputs capture")
+            ok = False
+            continue
+        results = dense_projections(load_inputs(case))
+        for path in sorted(outputs_dir.glob("*.parquet")):
+            indicator = path.stem
+            if indicator not in results:
+                print(f"[WARNING] {case}/{indicator}: not projected")
+                ok = False
+                continue
+            problems = compare_frames(pd.read_parquet(path), results[indicator])
+            if problems:
+                ok = False
+                print(f"[WARNING] {case}/{indicator}: differs from golden")
+                for problem in problems:
+                    print(f"[WARNING]     {problem}")
+            else:
+                print(f"[INFO] {case}/{indicator}: matches golden ({len(results[indicator])} rows)")
+    print(f"[INFO] Golden check {'passed' if ok else 'FAILED'} in {time.perf_counter() - start:.1f}s")
+    return ok
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "capture":
+        capture()
+    elif command == "check":
+        sys.exit(0 if check() else 1)
+    else:
+        sys.exit(f"Unknown command {command!r} (use capture or check)")
+
+
+if __name__ == "__main__":
+    main()
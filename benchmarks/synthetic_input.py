@@ -0,0 +1,166 @@
+"""
+Seeded synthetic input.xlsx for benchmarks.
+
+make_input() builds every sheet read by the implemented S1 indicators (pelts
+history, farm counts, ID19 economic sector baselines and the ID25-ID28
+environmental metrics) with the column layout of data/input/input.xlsx, at a
+configurable scale: number of Member States, species, history years and
+environmental metrics. Beyond the 27 Member States, regions named
+"<Member State> R<n>" are added, so the phase-out countries are always
+present. SCALES holds the sizes of the benchmark suite.
+
+Write a workbook (e.g. to run main.py on it) from the project root; an
+existing file is only replaced with --force:
+    python -m benchmarks.synthetic_input output.xlsx [--scale eu27] [--seed 42] [--force]
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from indicators.ID19 import INDICATOR_MAPPING, TARGET_SECTORS as ECONOMIC_SECTORS
+
+EU27 = [
+    "Austria", "Belgium", "Bulgaria", "Croatia", "Cyprus", "Czechia", "Denmark",
+    "Estonia", "Finland", "France", "Germany", "Greece", "Hungary", "Ireland",
+    "Italy", "Latvia", "Lithuania", "Luxembourg", "Malta", "Netherlands",
+    "Poland", "Portugal", "Romania", "Slovakia", "Slovenia", "Spain", "Sweden"
+]
+SPECIES = ["Mink", "Fox", "Raccoon dog", "Chinchilla"]
+ENVIRONMENTAL_SECTORS = ["Feed", "Other farm inputs", "Farming"]
+
+# Metrics (name, unit) of each environmental sheet; more are added as "Metric <n>"
+ENVIRONMENTAL_METRICS = {
+    "ID25": [("Freshwater ecotoxicity", "CTUe"), ("Human toxicity", "CTUh"), ("Ozone depletion", "kg CFC11 eq")],
+    "ID26": [("Climate change", "kg CO2 eq"), ("Water use", "m3"), ("Eutrophication", "kg P eq")],
+    "ID27": [("Waste generated", "tonnes")],
+    "ID28": [("Agricultural land occupation", "km2"), ("Climate change", "kg CO2 eq")],
+}
+
+SCALES = {
+    "small": {"n_countries": 8, "n_species": 4, "first_year": 2015, "n_metrics": 3},
+    "eu27": {"n_countries": 27, "n_species": 4, "first_year": 2010, "n_metrics": 3},
+    "x10": {"n_countries": 270, "n_species": 4, "first_year": 2010, "n_metrics": 30},
+    "x100": {"n_countries": 2700, "n_species": 4, "first_year": 2010, "n_metrics": 300},
+}
+
+
+def country_names(n_countries):
+    """The first n_countries of EU27, followed by regions of the Member States"""
+    names = list(EU27[:n_countries])
+    region = 1
+    while len(names) < n_countries:
+        names.extend(f"{ms} R{region}" for ms in EU27[:n_countries - len(names)])
+        region += 1
+    return names
+
+
+def species_names(n_species):
+    """The farmed species, followed by "Species <n>" placeholders"""
+    return SPECIES[:n_species] + [f"Species {i}" for i in range(len(SPECIES) + 1, n_species + 1)]
+
+
+def make_pelts(rng, countries, species, years, missing_share=0.1):
+    """Pelt production history with random trends, gaps and zero years"""
+    index = pd.MultiIndex.from_product([countries, species, years], names=["Country", "Species", "Year"])
+    df = index.to_frame(index=False)
+    n_groups = len(countries) * len(species)
+    base = rng.integers(1_000, 2_000_000, n_groups).astype(float)
+    growth = rng.normal(-0.03, 0.08, n_groups)
+    t = np.tile(years - years[0], n_groups)
+    noise = rng.normal(0, 0.1, len(df))
+    pelts = np.repeat(base, len(years)) * (1 + np.repeat(growth, len(years))) ** t * (1 + noise)
+    pelts[rng.random(len(df)) < 0.05] = 0
+    df["Produced_Pelts_Number"] = np.maximum(pelts, 0).astype(np.int64)
+    df = df[rng.random(len(df)) >= missing_share]
+    # Pre-calculated aggregate rows, dropped by the projection
+    totals = pd.DataFrame({"Country": countries, "Year": years[-1], "Species": "All species", "Produced_Pelts_Number": 1})
+    return pd.concat([df[["Country", "Year", "Species", "Produced_Pelts_Number"]], totals], ignore_index=True)
+
+
+def make_farms(rng, countries, species):
+    """Number of farms per Member State and species in 2024 and 2025"""
+    index = pd.MultiIndex.from_product(
+        [countries, species + ["All Species"], [2024, 2025]], names=["Country", "Species", "Year"]
+    )
+    df = index.to_frame(index=False)
+    df.insert(1, "Fur Industry Sector", "Farming")
+    df["Number of Farms"] = rng.integers(0, 300, len(df))
+    df["Source"] = "Historical"
+    return df
+
+
+def make_economics(rng):
+    """EU 2024 values and 2028 targets of every economic indicator per sector"""
+    df = pd.DataFrame({
+        "Country": "European Union", "Species": "All Species",
+        "Fur Industry Sector": ECONOMIC_SECTORS, "Year": 2024
+    })
+    for col_2024, col_2028 in INDICATOR_MAPPING.values():
+        df[col_2024] = rng.uniform(1, 500, len(df))
+        df[col_2028] = rng.uniform(1, 300, len(df))
+    return df
+
+
+def make_environment(rng, metrics, n_metrics):
+    """EU 2024 baseline of n_metrics environmental metrics per sector"""
+    metrics = metrics + [(f"Metric {i}", "unit") for i in range(len(metrics) + 1, n_metrics + 1)]
+    rows = [
+        {
+            "Country": "European Union", "Species": "All Species", "Fur Industry Sector": sector, "Year": 2024,
+            "Environmental Metric": metric, "Value": rng.uniform(0.001, 1e5), "Metric Unit": unit
+        }
+        for metric, unit in metrics
+        for sector in ENVIRONMENTAL_SECTORS
+    ]
+    return pd.DataFrame(rows)
+
+
+def make_input(n_countries=27, n_species=4, first_year=2010, last_year=2024, n_metrics=3, seed=42):
+    """
+    Synthetic input sheets ({sheet name: DataFrame}) of the implemented
+    S1 indicators. The same arguments always give the same sheets.
+    """
+    rng = np.random.default_rng(seed)
+    countries = country_names(n_countries)
+    species = species_names(n_species)
+    years = np.arange(first_year, last_year + 1)
+    sheets = {
+        "Amount_Of_Pelts_Produced_Per_MS": make_pelts(rng, countries, species, years),
+        "Amount_Fur_Companies_Per_MS": make_farms(rng, countries, species),
+        "ID19": make_economics(rng),
+    }
+    for sheet, metrics in ENVIRONMENTAL_METRICS.items():
+        sheets[sheet] = make_environment(rng, metrics, n_metrics)
+    return sheets
+
+
+def write_input(sheets, path):
+    """Write the sheets as an input.xlsx-shaped workbook"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for sheet, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic input workbook")
+    parser.add_argument("output", help="workbook to write (e.g. benchmarks/results/input_eu27.xlsx)")
+    parser.add_argument("--scale", default="eu27", choices=list(SCALES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="replace the output file if it exists")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    if output.exists() and not args.force:
+        parser.exit(1, f"[WARNING] {output} exists, not overwritten (use --force to replace it)\n")
+    sheets = make_input(**SCALES[args.scale], seed=args.seed)
+    write_input(sheets, output)
+    print(f"[INFO] Wrote {args.scale} input ({', '.join(f'{s}: {len(df)} rows' for s, df in sheets.items())}) to {output}")
+
+
+if __name__ == "__main__":
+    main()
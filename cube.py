@@ -0,0 +1,225 @@
+"""
+Labeled N-dimensional cube of projection values.
+
+The output sheets are long format: one row per key (Country, Species,
+Fur Industry Sector, Environmental Metric, Year) and one column per value.
+ProjectionCube holds the values of such a frame as a dense NumPy array with
+one axis per key column, plus the labels of every axis, so that
+
+- a slice (e.g. one Member State, or one metric) is an O(1) label lookup
+  and a view of the array instead of a boolean mask over every row;
+- totals along any axes (e.g. the EU total over Country) are one reduction;
+- a 2-D slice becomes the Year × Species / Year × Sector table of a figure
+  without pivot_table.
+
+from_long() builds a cube from a long-format frame (several value columns
+add a leading "Variable" axis) and to_long() converts it back, so sheets
+keep their long format at the boundaries (input, Excel output).
+
+Labels are sorted (Categorical keys in category order, i.e. lexically, see
+vocabulary.py). Keys without a row are NaN: a missing row and a NaN value
+are the same to a cube. Duplicate keys are summed, skipping NaN, like
+groupby().sum().
+
+Cubes are dense only; there is no sparse (coordinate) backing. A cube is
+built over the axes a lookup or figure uses, not over all five key columns,
+so its size is the product of those axes at most: Country × Species × Year is
+27 × 5 × 31 = 4185 cells at EU-27 scale (the largest cube a run can build), and
+2700 × 5 × 31 = 0.4 million cells (3 MB) for the 100× inputs of
+benchmarks/bench_projections.py. At that size, a dense array is smaller than
+the long frame it comes from, and a sparse format would only add index
+lookups to every slice and total.
+"""
+
+import numpy as np
+import pandas as pd
+
+from zero_runs import RUN_LENGTH, expand_zero_runs
+
+AXES = ["Country", "Species", "Fur Industry Sector", "Environmental Metric", "Year"]
+VARIABLE = "Variable"
+
+
+class ProjectionCube:
+    """Dense values with one labeled axis per key column"""
+
+    def __init__(self, data, coords):
+        self.data = np.asarray(data, dtype=float)
+        self.coords = {axis: pd.Index(labels, name=axis) for axis, labels in coords.items()}
+        if self.data.shape != tuple(len(labels) for labels in self.coords.values()):
+            raise ValueError(f"Data of shape {self.data.shape} does not match axes {self.sizes}")
+
+    @property
+    def dims(self):
+        return tuple(self.coords)
+
+    @property
+    def sizes(self):
+        return {axis: len(labels) for axis, labels in self.coords.items()}
+
+    def __repr__(self):
+        return f"ProjectionCube({' × '.join(f'{axis}: {n}' for axis, n in self.sizes.items())})"
+
+    # ---------------------------------------------------------
+    # Long format
+    # ---------------------------------------------------------
+    @classmethod
+    def from_long(cls, df, values, axes=None, fill_runs=True):
+        """
+        Cube of one value column (values: str) or several (a list, stacked
+        on a leading "Variable" axis) of a long-format frame, with one axis
+        per key column (default: the columns of AXES present in df).
+        Rows with a missing key are ignored. The zero runs of a compressed
+        frame (see zero_runs.py) fill every year they stand for; with
+        fill_runs=False the frame is read as stored and the later years of a
+        run are missing, for readers that count missing cells as 0.
+        """
+        axes = [axis for axis in AXES if axis in df.columns] if axes is None else list(axes)
+        value_cols = [values] if isinstance(values, str) else list(values)
+        if fill_runs and RUN_LENGTH in df.columns and "Year" in axes:
+            df = expand_zero_runs(df[list(dict.fromkeys(axes + value_cols + [RUN_LENGTH]))])
+
+        codes, coords = [], {}
+        for axis in axes:
+            axis_codes, labels = pd.factorize(df[axis], sort=True)
+            codes.append(axis_codes)
+            coords[axis] = labels
+        shape = tuple(len(labels) for labels in coords.values())
+        valid = np.logical_and.reduce([axis_codes >= 0 for axis_codes in codes]) if codes else np.ones(len(df), bool)
+        flat = np.ravel_multi_index([axis_codes[valid] for axis_codes in codes], shape) if codes else np.zeros(valid.sum(), int)
+        size = int(np.prod(shape))
+        counts = np.bincount(flat, minlength=size)
+        duplicated = counts.max(initial=0) > 1
+
+        data = np.full((len(value_cols), size), np.nan)
+        for i, col in enumerate(value_cols):
+            column = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)[valid]
+            if duplicated:
+                sums = np.bincount(flat, weights=np.nan_to_num(column), minlength=size)
+                data[i, counts > 0] = sums[counts > 0]
+            else:
+                data[i, flat] = column
+        data = data.reshape((len(value_cols),) + shape)
+
+        if isinstance(values, str):
+            return cls(data[0], coords)
+        return cls(data, {VARIABLE: pd.Index(value_cols), **coords})
+
+    def to_long(self, dropna=True):
+        """
+        Long-format frame with one row per cell (keys in label order) and
+        one value column per label of the "Variable" axis (or "Value");
+        cells that are NaN in every value column are dropped.
+        """
+        cube = self.transpose(VARIABLE, *(axis for axis in self.dims if axis != VARIABLE)) if VARIABLE in self.coords else self
+        axes = [axis for axis in cube.dims if axis != VARIABLE]
+        shape = tuple(cube.sizes[axis] for axis in axes)
+        values = cube.data.reshape((-1, int(np.prod(shape))) if VARIABLE in cube.coords else (1, -1))
+        keep = ~np.isnan(values).all(axis=0) if dropna else np.ones(values.shape[1], bool)
+
+        positions = np.unravel_index(np.flatnonzero(keep), shape)
+        columns = {axis: cube.coords[axis].take(pos).to_numpy() for axis, pos in zip(axes, positions)}
+        names = list(cube.coords[VARIABLE]) if VARIABLE in cube.coords else ["Value"]
+        for name, row in zip(names, values):
+            columns[name] = row[keep]
+        df = pd.DataFrame(columns)
+        # Keep Categorical keys Categorical
+        for axis in axes:
+            if isinstance(cube.coords[axis].dtype, pd.CategoricalDtype):
+                df[axis] = df[axis].astype(cube.coords[axis].dtype)
+        return df
+
+    def to_frame(self, index="Year", columns=None, dropna=True):
+        """
+        A 2-D cube as a table (e.g. Year × Species, as pivot_table would
+        give it); with dropna, rows and columns without any value are dropped.
+        """
+        columns = columns if columns is not None else next(axis for axis in self.dims if axis != index)
+        cube = self.transpose(index, columns)
+        data, rows, cols = cube.data, cube.coords[index], cube.coords[columns]
+        if dropna:
+            missing = np.isnan(data)
+            keep_rows = ~missing.all(axis=1)
+            keep_cols = ~missing.all(axis=0)
+            data, rows, cols = data[keep_rows][:, keep_cols], rows[keep_rows], cols[keep_cols]
+        return pd.DataFrame(data, index=rows, columns=cols)
+
+    # ---------------------------------------------------------
+    # Selection
+    # ---------------------------------------------------------
+    def sel(self, **labels):
+        """
+        Select by label along the given axes: a single label drops the
+        axis, a list of labels keeps it. Raises KeyError for unknown labels.
+        """
+        data = self.data
+        coords = {}
+        position = 0
+        for axis, axis_labels in self.coords.items():
+            if axis not in labels:
+                coords[axis] = axis_labels
+                position += 1
+                continue
+            label = labels[axis]
+            if pd.api.types.is_list_like(label):
+                indexer = axis_labels.get_indexer(label)
+                if (indexer < 0).any():
+                    raise KeyError(f"{axis}: {list(np.asarray(label)[indexer < 0])}")
+                data = np.take(data, indexer, axis=position)
+                coords[axis] = axis_labels.take(indexer)
+                position += 1
+            else:
+                data = np.take(data, axis_labels.get_loc(label), axis=position)
+        if not coords:
+            return float(data)
+        return ProjectionCube(data, coords)
+
+    def lookup(self, **labels):
+        """
+        Values at the label tuples given as equal-length arrays per axis
+        (e.g. Country=..., Species=...), followed by the remaining axes;
+        NaN where a label is not on its axis.
+        """
+        axes = list(labels)
+        indexers = [self.coords[axis].get_indexer(labels[axis]) for axis in axes]
+        rest = [axis for axis in self.dims if axis not in labels]
+        cube = self.transpose(*axes, *rest)
+        found = np.logical_and.reduce([indexer >= 0 for indexer in indexers])
+        out = np.full((len(found),) + tuple(cube.sizes[axis] for axis in rest), np.nan)
+        out[found] = cube.data[tuple(indexer[found] for indexer in indexers)]
+        return out
+
+    def reindex(self, **labels):
+        """Cube with the given labels along each axis (NaN for labels that were not on it)"""
+        data = self.data
+        coords = dict(self.coords)
+        for axis, axis_labels in labels.items():
+            position = self.dims.index(axis)
+            indexer = self.coords[axis].get_indexer(axis_labels)
+            data = np.take(data, np.where(indexer >= 0, indexer, 0), axis=position)
+            missing = [slice(None)] * data.ndim
+            missing[position] = indexer < 0
+            data[tuple(missing)] = np.nan
+            coords[axis] = pd.Index(axis_labels)
+        return ProjectionCube(data, coords)
+
+    def transpose(self, *dims):
+        """Cube with the given axes first (in that order), followed by the others"""
+        order = list(dims) + [axis for axis in self.dims if axis not in dims]
+        if order == list(self.dims):
+            return self
+        axes = [self.dims.index(axis) for axis in order]
+        return ProjectionCube(self.data.transpose(axes), {axis: self.coords[axis] for axis in order})
+
+    # ---------------------------------------------------------
+    # Aggregation
+    # ---------------------------------------------------------
+    def sum(self, *dims):
+        """Total over the given axes (all if none), NaN cells counting as 0"""
+        dims = dims or self.dims
+        axes = tuple(self.dims.index(axis) for axis in dims)
+        data = np.nansum(self.data, axis=axes)
+        coords = {axis: labels for axis, labels in self.coords.items() if axis not in dims}
+        if not coords:
+            return float(data)
+        return ProjectionCube(data, coords)
@@ -0,0 +1,329 @@
+"""
+Figure jobs and process-pool rendering.
+
+An indicator's make_figures function describes each chart as a FigureJob: a
+small picklable spec holding the plotted data, the labels and the file name.
+FigureRenderer writes the files to the figures folder of the scenario it
+renders for, and renders the jobs on a process pool with the Agg backend
+and the global Theme, so PNG rasterisation of many Member State and metric
+charts runs in parallel while the projections continue.
+
+matplotlib is only imported once a figure is rendered (or a renderer is
+created), so the indicator modules can build FigureJob specs, and
+projection-only runs can import them, without loading it.
+
+Rendering is content-addressed: every job is keyed by a hash of its plotted
+data (numbers rounded to KEY_DIGITS significant digits) and options, the
+theme rcParams and the rendering code (render_figure and the Theme setup,
+including its axis hook). The keys of the written files are kept in a JSON
+manifest next to the figures, and a job whose key and file are unchanged is
+not drawn again.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from figure_theme import Theme
+
+MANIFEST_NAME = "figure_manifest.json"
+
+_THEME_APPLIED = False
+
+
+class FigureJob:
+    """
+    Spec of one chart: line series and/or a stacked bar table, title, axis
+    labels, legend, grid and axis formatting, and the PNG file name (relative
+    to the figures folder). Styling arguments are passed through to
+    matplotlib unchanged.
+    """
+
+    def __init__(self, filename, title, ylabel, xlabel=None, legend=None, grid=None,
+                 x_rotation=None, y_formatter=None, tight_layout=False, savefig_kwargs=None):
+        self.filename = filename
+        self.title = title
+        self.ylabel = ylabel
+        self.xlabel = xlabel
+        self.legend = legend                  # kwargs of ax.legend (None: no legend)
+        self.grid = grid                      # kwargs of ax.grid(True, ...) (None: theme grid)
+        self.x_rotation = x_rotation          # rotation of the x tick labels (right-aligned)
+        self.y_formatter = y_formatter        # module-level function (value, position) -> label
+        self.tight_layout = tight_layout
+        self.savefig_kwargs = savefig_kwargs or {}
+        self.lines = []
+        self.stacked_bars = None
+        self.bar_width = None
+
+    def add_line(self, x, y, **style):
+        """Add a line series; style holds ax.plot keyword arguments (label, color, ...)"""
+        self.lines.append((np.asarray(x), np.asarray(y), style))
+
+    def set_stacked_bars(self, table, width=0.8):
+        """Plot the columns of a DataFrame (index on the x axis) as stacked bars"""
+        self.stacked_bars = table
+        self.bar_width = width
+
+
+def format_thousands(x, p):
+    """Axis label with thousands separators and no decimals"""
+    return f'{x:,.0f}'
+
+
+def apply_theme():
+    """Apply the global Theme once per process (before the first figure is drawn or keyed)"""
+    global _THEME_APPLIED
+    if not _THEME_APPLIED:
+        Theme.apply_global()
+        _THEME_APPLIED = True
+
+
+def render_figure(job, figures_dir):
+    """Draw one FigureJob and save it as PNG in figures_dir"""
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import FuncFormatter
+
+    apply_theme()
+    fig, ax = plt.subplots()
+
+    if job.stacked_bars is not None:
+        job.stacked_bars.plot(kind='bar', stacked=True, ax=ax, width=job.bar_width)
+    for x, y, style in job.lines:
+        ax.plot(x, y, **style)
+
+    ax.set_title(job.title)
+    ax.set_ylabel(job.ylabel)
+    if job.xlabel is not None:
+        ax.set_xlabel(job.xlabel)
+    if job.legend is not None:
+        ax.legend(**job.legend)
+    if job.grid is not None:
+        ax.grid(True, **job.grid)
+    if job.x_rotation is not None:
+        plt.setp(ax.get_xticklabels(), rotation=job.x_rotation, ha="right")
+    if job.y_formatter is not None:
+        ax.get_yaxis().set_major_formatter(FuncFormatter(job.y_formatter))
+
+    if job.tight_layout:
+        fig.tight_layout()
+    output_path = Path(figures_dir) / job.filename
+    fig.savefig(output_path, **job.savefig_kwargs)
+    plt.close(fig)
+    return output_path
+
+
+def timed_render(job, figures_dir):
+    """render_figure, returning the seconds it took"""
+    start = time.perf_counter()
+    render_figure(job, figures_dir)
+    return time.perf_counter() - start
+
+
+# Significant digits of plotted numbers in the figure keys
+KEY_DIGITS = 12
+
+
+def _hash_array(h, values):
+    """
+    Feed an array (shape and contents) into a hash. Numbers are hashed as
+    text with KEY_DIGITS significant digits, so the same data read back from
+    projected_data.xlsx (other dtype, last-bit differences) gives the same key.
+    """
+    values = np.asarray(values)
+    h.update(f"{values.shape}".encode())
+    if values.dtype.kind in "biuf":
+        # + 0.0 turns -0.0 into 0.0
+        text = np.char.mod(f"%.{KEY_DIGITS}g", values.astype(np.float64) + 0.0)
+        h.update(" ".join(text.ravel().tolist()).encode())
+    else:
+        h.update(repr(values.tolist()).encode())
+
+
+def _function_fingerprint(func):
+    """Name and source of a function, so edits to its code change the keys"""
+    if func is None:
+        return None
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = None
+    return (func.__module__, func.__qualname__, source)
+
+
+def theme_fingerprint():
+    """
+    Hash of the active rcParams (without the backend) and of the rendering
+    code: render_figure and the Theme setup (Theme.apply_global, whose
+    axis hook formats and rotates the ticks outside rcParams, and
+    apply_theme); computed in the main process, after the Theme is applied.
+    """
+    import matplotlib
+
+    params = sorted((k, v) for k, v in matplotlib.rcParams.items() if not k.startswith("backend"))
+    h = hashlib.sha256()
+    h.update(repr(params).encode())
+    for func in (render_figure, Theme.apply_global, apply_theme):
+        h.update(repr(_function_fingerprint(func)).encode())
+    h.update(matplotlib.__version__.encode())
+    return h.hexdigest()
+
+
+def job_key(job, theme_key):
+    """Content hash of a FigureJob: plotted data, labels and options, theme and rendering code"""
+    h = hashlib.sha256(theme_key.encode())
+    h.update(repr((
+        job.filename, job.title, job.ylabel, job.xlabel, job.legend, job.grid,
+        job.x_rotation, _function_fingerprint(job.y_formatter), job.tight_layout,
+        sorted(job.savefig_kwargs.items()), job.bar_width
+    )).encode())
+
+    for x, y, style in job.lines:
+        _hash_array(h, x)
+        _hash_array(h, y)
+        h.update(repr(sorted(style.items())).encode())
+
+    if job.stacked_bars is not None:
+        h.update(repr(list(job.stacked_bars.columns)).encode())
+        _hash_array(h, job.stacked_bars.index.to_numpy())
+        _hash_array(h, job.stacked_bars.to_numpy())
+
+    return h.hexdigest()
+
+
+def init_render_worker():
+    """Worker initializer: non-interactive backend and global styling"""
+    global _THEME_APPLIED
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+    Theme.apply_global()
+    _THEME_APPLIED = True
+
+
+class FigureRenderer:
+    """
+    Renders the figure jobs of indicators into figures_dir on a process pool.
+
+    With max_workers=1 every job is rendered immediately in this process;
+    otherwise jobs are queued on the pool and wait() blocks until all are
+    written, re-raising the first rendering error.
+
+    With cache=True, jobs whose key matches the manifest in figures_dir (and
+    whose file still exists) are skipped; the manifest is rewritten with the
+    keys of the rendered files when the renderer is closed.
+    """
+
+    def __init__(self, figures_dir, max_workers=None, cache=True):
+        self.figures_dir = Path(figures_dir)
+        self.figures_dir.mkdir(parents=True, exist_ok=True)
+        self.pool = None
+        if max_workers != 1:
+            self.pool = ProcessPoolExecutor(max_workers=max_workers, initializer=init_render_worker)
+        self.pending = []
+        # Seconds spent drawing the figures of each indicator (summed over jobs)
+        self.render_times = {}
+
+        self.manifest_file = self.figures_dir / MANIFEST_NAME if cache else None
+        self.manifest = self._load_manifest()
+        apply_theme()
+        self.theme_key = theme_fingerprint() if self.manifest_file is not None else None
+        self._manifest_changed = False
+
+    def _load_manifest(self):
+        """Keys of the figures written by previous runs (empty if none or unreadable)"""
+        if self.manifest_file is None or not self.manifest_file.exists():
+            return {}
+        try:
+            return json.loads(self.manifest_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            print(f"[WARNING] Could not read {self.manifest_file}, redrawing all figures")
+            return {}
+
+    def _split_cached(self, jobs):
+        """Split jobs into (to_render, keys, n_cached) using the manifest"""
+        if self.manifest_file is None:
+            return jobs, [None] * len(jobs), 0
+        to_render, keys = [], []
+        for job in jobs:
+            key = job_key(job, self.theme_key)
+            if self.manifest.get(job.filename) == key and (self.figures_dir / job.filename).exists():
+                continue
+            to_render.append(job)
+            keys.append(key)
+        return to_render, keys, len(jobs) - len(to_render)
+
+    def _record(self, job, key):
+        if key is not None:
+            self.manifest[job.filename] = key
+            self._manifest_changed = True
+
+    def submit(self, indicator, jobs):
+        """Render (or queue) the figure jobs of one indicator that are not cached"""
+        to_render, keys, n_cached = self._split_cached(jobs)
+        if self.pool is None or not to_render:
+            for job, key in zip(to_render, keys):
+                self._add_time(indicator, timed_render(job, self.figures_dir))
+                self._record(job, key)
+            self._report(indicator, len(to_render), n_cached)
+            return
+        futures = [self.pool.submit(timed_render, job, self.figures_dir) for job in to_render]
+        self.pending.append((indicator, list(zip(to_render, keys, futures)), n_cached))
+
+    def wait(self):
+        """Wait for every queued job, reporting each indicator once its figures are written"""
+        while self.pending:
+            indicator, submitted, n_cached = self.pending.pop(0)
+            for job, key, fut in submitted:
+                self._add_time(indicator, fut.result())
+                self._record(job, key)
+            self._report(indicator, len(submitted), n_cached)
+
+    def _add_time(self, indicator, seconds):
+        self.render_times[indicator] = self.render_times.get(indicator, 0.0) + seconds
+
+    @staticmethod
+    def _report(indicator, n_rendered, n_cached):
+        if n_cached:
+            print(f"[INFO] Figures generated for {indicator} ({n_rendered} drawn, {n_cached} unchanged)")
+        else:
+            print(f"[INFO] Figures generated for {indicator} ({n_rendered} files)")
+
+    def save_manifest(self):
+        """Atomically write the manifest of rendered figure keys"""
+        if self.manifest_file is None or not self._manifest_changed:
+            return
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.manifest_file.parent, prefix=".figure_manifest.", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._manifest_changed = False
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+        # Record whatever was rendered, even if a later job failed
+        self.save_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.wait()
+        finally:
+            self.close()
@@ -1,6 +1,5 @@
 # figure_theme.py
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
+# matplotlib is imported by apply_global(), so projection-only runs never load it
 
 class Theme:
     """
@@ -20,6 +19,9 @@ class Theme:
         """
         Apply all global styling, grid settings, and axis formatting in one place.
         """
+        import matplotlib.pyplot as plt
+        import matplotlib.ticker as ticker
+
         # 1. Base RC Parameters for the "Curve Style"
         plt.rcParams.update({
             # Figure size and Fonts
@@ -0,0 +1,86 @@
+"""
+Content fingerprints for incremental projection runs.
+
+main.py records, for every indicator and scenario in projection_log, a
+fingerprint of its input sheet, of the upstream projections it reads, of
+its code and of its result. A later run reuses a logged projection when the
+first three are unchanged and recomputes it otherwise; a downstream
+indicator is recomputed when the result of one of its upstream indicators
+changed.
+"""
+
+import hashlib
+import sys
+from functools import lru_cache
+from importlib import import_module
+from pathlib import Path
+from types import ModuleType
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+# Columns of projection_log compared before a projection is reused
+FINGERPRINT_COLUMNS = ["Input Fingerprint", "Upstream Fingerprint", "Code Fingerprint"]
+OUTPUT_FINGERPRINT = "Output Fingerprint"
+
+
+def combine(*parts):
+    """SHA-256 of a sequence of strings"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def frame_fingerprint(df):
+    """Hash of a DataFrame's columns, dtypes and values (row order included)"""
+    if df is None:
+        return combine("None")
+    h = hashlib.sha256(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    try:
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64).tobytes())
+    except TypeError:
+        # Unhashable cells (e.g. lists): fall back to the text of the frame
+        h.update(df.to_csv(index=False).encode())
+    return h.hexdigest()
+
+
+def _is_project_module(mod):
+    path = getattr(mod, "__file__", None)
+    if path is None:
+        return False
+    path = Path(path).resolve()
+    return path.is_relative_to(PROJECT_ROOT) and "site-packages" not in path.parts
+
+
+def _project_modules(mod, found):
+    """Collect mod and the project modules it references (directly or through imported names)"""
+    if mod.__name__ in found:
+        return
+    found[mod.__name__] = mod
+    for value in vars(mod).values():
+        ref = value if isinstance(value, ModuleType) else sys.modules.get(getattr(value, "__module__", None) or "")
+        if ref is not None and _is_project_module(ref):
+            _project_modules(ref, found)
+
+
+@lru_cache(maxsize=None)
+def code_fingerprint(indicator):
+    """
+    Hash of the source of an indicator module and of every project module it
+    uses (e.g. impact_scaling.py, theil_sen.py), plus the numpy and pandas versions.
+    """
+    try:
+        mod = import_module(f"indicators.{indicator}")
+    except ModuleNotFoundError:
+        return combine(indicator, "missing")
+    found = {}
+    _project_modules(mod, found)
+    h = hashlib.sha256(combine(np.__version__, pd.__version__).encode())
+    for name in sorted(found):
+        h.update(name.encode())
+        h.update(Path(found[name].__file__).read_bytes())
+    return h.hexdigest()
@@ -0,0 +1,194 @@
+"""
+Shared impact-scaling engine for the environmental indicators (ID25, ID26, ID27).
+
+Every (Environmental Metric, Fur Industry Sector) baseline value of 2024 is
+turned into an impact-per-pelt coefficient, and all coefficients are
+broadcast against the EU pelt production of every year in one array multiply:
+    Value_t = (Value_2024 / Pelts_2024) * Pelts_t
+The indicator modules only configure it (sectors, figure file prefix).
+"""
+
+import pandas as pd
+import numpy as np
+from cube import ProjectionCube
+from figure_jobs import FigureJob
+from projection_registry import get_projection
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+PELTS_SHEET = "Amount_Of_Pelts_Produced_Per_MS"
+
+PROJECTION_YEARS = np.arange(2010, 2041)
+
+OUTPUT_HEADERS = [
+    "Country", "Species", "Fur Industry Sector", "Year",
+    "Environmental Metric", "Value", "Metric Unit"
+]
+
+
+def eu_pelt_series(df_pelts):
+    """
+    Total EU pelt production per year (summed across all countries).
+    Uses the "All Species" (or "All species") aggregate rows when present,
+    otherwise sums every row.
+    """
+    if "Species" in df_pelts.columns and "All Species" in df_pelts["Species"].values:
+        return df_pelts[df_pelts["Species"] == "All Species"].groupby("Year")["Pelts"].sum()
+    if "Species" in df_pelts.columns and "All species" in df_pelts["Species"].values:
+        return df_pelts[df_pelts["Species"] == "All species"].groupby("Year")["Pelts"].sum()
+    # Fallback: sum everything by year
+    return df_pelts.groupby("Year")["Pelts"].sum()
+
+
+def impact_baseline(df_input, target_sectors):
+    """
+    One EU / All Species 2024 baseline row per (Metric, Sector): metrics in
+    order of appearance, sectors in target order. Empty if there is none.
+    """
+    # Filter for EU / All Species / 2024 and relevant sectors
+    df_baseline = df_input[
+        (df_input["Country"] == "European Union") &
+        (df_input["Species"] == "All Species") &
+        (df_input["Year"] == 2024) &
+        (df_input["Fur Industry Sector"].isin(target_sectors))
+    ].copy()
+
+    df_baseline = df_baseline.drop_duplicates(subset=["Environmental Metric", "Fur Industry Sector"])
+    metric_order = {metric: i for i, metric in enumerate(df_baseline["Environmental Metric"].unique())}
+    sector_order = {sector: i for i, sector in enumerate(target_sectors)}
+    df_baseline = df_baseline.assign(
+        _metric_rank=df_baseline["Environmental Metric"].map(metric_order),
+        _sector_rank=df_baseline["Fur Industry Sector"].map(sector_order)
+    ).sort_values(["_metric_rank", "_sector_rank"], kind="stable")
+    return df_baseline
+
+
+def project_impacts(df_input, indicator, target_sectors):
+    """
+    Projects Environmental Metrics based on Pelt Production.
+
+    Methodology:
+    1. Calculate Total EU Pelt Production in 2024.
+    2. Derive Impact Coefficient per Pelt for each Sector and Metric in 2024:
+       Coeff = Value_2024 / Pelts_2024
+    3. Project future values: Value_t = Coeff * Pelts_t
+    """
+    # ---------------------------------------------------------
+    # 1. Load Drivers (EU Pelt Production)
+    # ---------------------------------------------------------
+    df_pelts = get_projection(PELTS_SHEET)
+    if df_pelts is None:
+        print(f"[WARNING] Projection {PELTS_SHEET} not available. Cannot run {indicator} projection.")
+        return pd.DataFrame()
+
+    eu_pelts = eu_pelt_series(df_pelts).reindex(PROJECTION_YEARS, fill_value=0).to_numpy()
+    pelts_2024 = eu_pelts[PROJECTION_YEARS == 2024][0]
+
+    if pelts_2024 == 0:
+        print("[WARNING] Total EU Pelt production in 2024 is 0. Coefficients cannot be calculated.")
+        return pd.DataFrame()
+
+    # ---------------------------------------------------------
+    # 2. Prepare Input Data (Baseline 2024)
+    # ---------------------------------------------------------
+    df_baseline = impact_baseline(df_input, target_sectors)
+    if df_baseline.empty:
+        print(f"[WARNING] No baseline data found for {indicator} (EU, All Species, 2024).")
+        return pd.DataFrame()
+
+    # ---------------------------------------------------------
+    # 3. Generate Projections (2010 - 2040)
+    # ---------------------------------------------------------
+    # Impact per pelt of every (Metric, Sector), broadcast against the yearly driver
+    val_2024 = pd.to_numeric(df_baseline["Value"], errors="coerce").to_numpy(dtype=float)
+    impact_per_pelt = val_2024 / pelts_2024
+    projected = impact_per_pelt[:, np.newaxis] * eu_pelts[np.newaxis, :]
+
+    # ---------------------------------------------------------
+    # 4. Final Formatting
+    # ---------------------------------------------------------
+    n_years = len(PROJECTION_YEARS)
+    df_projection = pd.DataFrame({
+        "Country": "European Union",
+        "Species": "All Species",
+        "Fur Industry Sector": np.repeat(df_baseline["Fur Industry Sector"].to_numpy(), n_years),
+        "Year": np.tile(PROJECTION_YEARS, len(df_baseline)),
+        "Environmental Metric": np.repeat(df_baseline["Environmental Metric"].to_numpy(), n_years),
+        "Value": projected.ravel(),
+        "Metric Unit": np.repeat(df_baseline["Metric Unit"].to_numpy(), n_years)
+    })
+
+    return df_projection[OUTPUT_HEADERS]
+
+
+def make_impact_figures(df, target_sectors, figure_prefix):
+    """
+    Builds Stacked Bar Charts for each Environmental Metric.
+    X-axis: Year
+    Stacks: Fur Industry Sectors (in target_sectors order)
+    Files are saved as "<figure_prefix>_<metric>.png".
+    Returns a list of FigureJob specs.
+    """
+    if df.empty:
+        return []
+
+    # Filter for EU and All Species
+    df_plot = df[
+        (df["Country"] == "European Union") &
+        (df["Species"] == "All Species")
+    ].copy()
+
+    # Get list of metrics to plot, with the unit of each (first row of the metric)
+    metrics = df_plot["Environmental Metric"].dropna().unique()
+    units = (
+        df_plot.drop_duplicates("Environmental Metric").set_index("Environmental Metric")["Metric Unit"]
+        if "Metric Unit" in df_plot.columns else None
+    )
+    # Metric × Sector × Year cube: each metric is a slice, not a filter over every row
+    cube = ProjectionCube.from_long(df_plot, "Value", axes=["Environmental Metric", "Fur Industry Sector", "Year"])
+    jobs = []
+
+    for metric in metrics:
+        # Table: Index=Year, Columns=Sector (those with values for this metric), Values=Value
+        pivot_df = cube.sel(**{"Environmental Metric": metric}).to_frame(index="Year", columns="Fur Industry Sector").fillna(0)
+
+        # Reindex to ensure consistent stacking order (Feed on bottom)
+        # Only include sectors that exist in the pivot
+        available_sectors = [s for s in target_sectors if s in pivot_df.columns]
+        pivot_df = pivot_df.reindex(columns=available_sectors)
+
+        if pivot_df.sum().sum() == 0:
+            continue
+
+        # Determine Unit for Label
+        unit = units[metric] if units is not None else ""
+
+        # Save filename
+        safe_name = metric.replace(" ", "_").replace("/", "_").replace(":", "")
+
+        job = FigureJob(
+            f"{figure_prefix}_{safe_name}.png",
+            title=f"Projected EU Fur Industry Impact: {metric}",
+            ylabel=f"{metric} ({unit})",
+            xlabel="Year",
+            legend={"title": "Sector", "loc": "upper right"},
+            x_rotation=45,
+            # Flexible formatter that handles small decimals (common in env metrics) or large numbers
+            y_formatter=format_impact_value,
+            tight_layout=True
+        )
+        job.set_stacked_bars(pivot_df, width=0.8)
+        jobs.append(job)
+
+    return jobs
+
+
+def format_impact_value(x, p):
+    """Axis label for impact values, from large totals to small decimals"""
+    if x >= 1000:
+        return f'{x:,.0f}'
+    elif x >= 1:
+        return f'{x:,.2f}'
+    else:
+        return f'{x:,.4g}'
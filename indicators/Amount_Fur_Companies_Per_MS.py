@@ -6,17 +6,28 @@ Contains two public functions for scenario S1:
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
-from pathlib import Path
-from figure_theme import Theme
+import numpy as np
+from cube import ProjectionCube
+from figure_jobs import FigureJob
+from projection_registry import get_projection
+from zero_runs import compress_zero_runs
 
 # ---------------------------------------------------------
-# CONSTANTS & FILE PATHS
+# CONSTANTS
 # ---------------------------------------------------------
-OUTPUT_BASE_DIR = Path("data/output/S1_output")
-PROJECTED_DATA_FILE = OUTPUT_BASE_DIR / "projected_data.xlsx"
 PRODUCTION_SHEET = "Amount_Of_Pelts_Produced_Per_MS"
 
+# Projections of other indicators read by this one (see scheduler.py)
+UPSTREAM = [PRODUCTION_SHEET]
+# Value columns whose zero years are stored as runs (see zero_runs.py)
+ZERO_RUN_VALUES = ["Number of Farms"]
+
+TARGET_SECTOR = "Farming"
+
+# Projected years; the baseline year keeps the actual value provided in the input
+PROJECTION_YEARS = np.arange(2010, 2041)
+BASELINE_YEAR = 2025
+
 # Colors for plotting
 SPECIES_COLORS = {
     "Mink": "#1f77b4",
@@ -26,209 +37,197 @@ SPECIES_COLORS = {
     "All Species": "#9467bd"
 }
 
-def run_projection_S1(df_historical):
+def farm_baseline(df_historical):
     """
-    Projects the number of fur farms per species based on the proportional 
-    change of pelt production relative to the 2025 baseline.
+    Species-specific Farming rows of the baseline year (2025), with the sector
+    names normalized and Year / Number of Farms made numeric.
     """
-    if df_historical.empty:
-        return pd.DataFrame()
-
-    if not PROJECTED_DATA_FILE.exists():
-        print(f"[WARNING] Could not find {PROJECTED_DATA_FILE}. Returning historical data only.")
-        return df_historical
-
-    # 1. Load production driver (Pelts)
-    #    Expected columns in production sheet: MS, Species, Year, Pelts
-    try:
-        df_production = pd.read_excel(PROJECTED_DATA_FILE, sheet_name=PRODUCTION_SHEET)
-    except ValueError:
-        print(f"[WARNING] Sheet {PRODUCTION_SHEET} not found. Returning historical data only.")
-        return df_historical
-
-    # 2. Clean Historical Data
     #    Filter for 'Farming' (or 'Farming') and ensure Year is int
     df_clean = df_historical.copy()
     df_clean["Fur Industry Sector"] = df_clean["Fur Industry Sector"].fillna("Farming").astype(str).str.strip()
     # Normalize sector names to "Fur Farming" for consistency
     df_clean.loc[df_clean["Fur Industry Sector"].isin(["", "nan", "Farming"]), "Fur Industry Sector"] = "Farming"
     
-    target_sector = "Farming"
     df_clean["Year"] = pd.to_numeric(df_clean["Year"], errors="coerce").fillna(0).astype(int)
     df_clean["Number of Farms"] = pd.to_numeric(df_clean["Number of Farms"], errors="coerce").fillna(0)
 
-    # 3. Get Baseline Data (Year 2025)
     #    We only want species-specific rows, explicitly excluding pre-calculated 'All Species' if present
-    df_farms_2025 = df_clean[
-        (df_clean["Year"] == 2025) & 
-        (df_clean["Fur Industry Sector"] == target_sector) &
+    return df_clean[
+        (df_clean["Year"] == BASELINE_YEAR) & 
+        (df_clean["Fur Industry Sector"] == TARGET_SECTOR) &
         (df_clean["Species"].str.lower() != "all species")
     ].copy()
 
-    # Pre-process Production Data for fast lookup
-    # Pivot so we can quickly look up [Year, MS, Species] -> Pelts
+
+def project_farms(farms_2025, prod, baseline_col):
+    """
+    Number of farms of every baseline row and year: the 2025 farms scaled by
+    the production ratio prod_t / prod_2025 (0 if there is no 2025 production).
+
+    prod has shape [row × year], or [draw × row × year] for sampled
+    production (see sensitivity.py); the result has the same shape.
+    """
+    prod_2025 = prod[..., baseline_col]
+    has_baseline = prod_2025 > 0
+    ratio = np.divide(
+        prod, prod_2025[..., np.newaxis], out=np.zeros_like(prod), where=has_baseline[..., np.newaxis]
+    )
+    farms = np.where(has_baseline[..., np.newaxis], farms_2025[:, np.newaxis] * ratio, 0.0)
+    farms[..., baseline_col] = farms_2025
+    return farms
+
+
+def run_projection_S1(df_historical):
+    """
+    Projects the number of fur farms per species based on the proportional 
+    change of pelt production relative to the 2025 baseline.
+    """
+    if df_historical.empty:
+        return pd.DataFrame()
+
+    # 1. Load production driver (Pelts)
+    #    Expected columns in production sheet: MS, Species, Year, Pelts
+    df_production = get_projection(PRODUCTION_SHEET)
+    if df_production is None:
+        print(f"[WARNING] Projection {PRODUCTION_SHEET} not available. Returning historical data only.")
+        return df_historical
+
+    # 2. Clean Historical Data and get Baseline Data (Year 2025)
+    df_farms_2025 = farm_baseline(df_historical)
+
+    # Pre-process Production Data as an MS × Species × Year cube
     # Ensure production dataframe uses same naming conventions (MS vs Country)
     if "Country" in df_production.columns and "MS" not in df_production.columns:
         df_production = df_production.rename(columns={"Country": "MS"})
-    
-    prod_pivot = df_production.groupby(["MS", "Species", "Year"])["Pelts"].sum()
-
-    projection_rows = []
-    # Project for years 2010 to 2040
-    # We include 2025 in the loop logic or just append the actual 2025 rows later. 
-    # The prompt asks to exclude 2025 from calculation since we have it, but add it to output.
-    all_years = range(2010, 2041)
-
-    for _, row in df_farms_2025.iterrows():
-        ms = row["Country"] # Input uses 'Country'
-        species = row["Species"]
-        farms_2025 = row["Number of Farms"]
-        source_2025 = row.get("Source", "Historical")
-
-        # Get production in baseline year (2025) for this MS and Species
-        try:
-            prod_2025 = prod_pivot.loc[(ms, species, 2025)]
-        except KeyError:
-            prod_2025 = 0
-
-        for year in all_years:
-            if year == 2025:
-                # Use the actual historical value provided in the input
-                projection_rows.append({
-                    "Country": ms,
-                    "Fur Industry Sector": target_sector,
-                    "Species": species,
-                    "Year": year,
-                    "Number of Farms": farms_2025,
-                    "Source": source_2025
-                })
-                continue
-
-            # For other years, use the ratio of production
-            try:
-                prod_t = prod_pivot.loc[(ms, species, year)]
-            except KeyError:
-                prod_t = 0
-            
-            if prod_2025 > 0:
-                farms_t = farms_2025 * (prod_t / prod_2025)
-            else:
-                farms_t = 0
-
-            projection_rows.append({
-                "Country": ms,
-                "Fur Industry Sector": target_sector,
-                "Species": species,
-                "Year": year,
-                "Number of Farms": farms_t,
-                "Source": "Projected (S1)"
-            })
-
-    # 4. Construct Final DataFrame
-    df_final = pd.DataFrame(projection_rows)
-    
-    # Ensure standard columns are present
+
+    # Project for years 2010 to 2040; 2025 keeps the actual value provided in the input
+    all_years = PROJECTION_YEARS
+    baseline_col = np.flatnonzero(all_years == BASELINE_YEAR)[0]
+
+    # Zero runs of the pelt projection are read as stored: their later years are missing keys
+    prod_cube = ProjectionCube.from_long(
+        df_production, "Pelts", axes=["MS", "Species", "Year"], fill_runs=False
+    ).reindex(Year=all_years)
+    # Align production to every baseline row; missing (MS, Species, Year) keys count as 0
+    prod = np.nan_to_num(prod_cube.lookup(MS=df_farms_2025["Country"], Species=df_farms_2025["Species"]), nan=0.0)
+    farms_2025 = df_farms_2025["Number of Farms"].to_numpy()
+
+    # For other years, use the ratio of production (0 if there is no 2025 production)
+    farms = project_farms(farms_2025, prod, baseline_col)
+
+    source = np.full(farms.shape, "Projected (S1)", dtype=object)
+    source[:, baseline_col] = df_farms_2025["Source"].to_numpy() if "Source" in df_farms_2025.columns else "Historical"
+
+    # 3. Construct Final DataFrame (one row per baseline row and year)
+    n_years = len(all_years)
+    df_final = pd.DataFrame({
+        "Country": np.repeat(df_farms_2025["Country"].to_numpy(), n_years),
+        "Fur Industry Sector": TARGET_SECTOR,
+        "Species": np.repeat(df_farms_2025["Species"].to_numpy(), n_years),
+        "Year": np.tile(all_years, len(df_farms_2025)),
+        "Number of Farms": farms.ravel(),
+        "Source": source.ravel()
+    })
+
     output_headers = ["Country", "Fur Industry Sector", "Species", "Year", "Number of Farms", "Source"]
-    # Add Source column if missing (logic above handles it, but safety check)
-    if "Source" not in df_final.columns:
-        df_final["Source"] = "Projected (S1)"
-        
-    return df_final[output_headers]
+    # Years without farms (after a phase-out) are stored as runs (see zero_runs.py)
+    return compress_zero_runs(df_final[output_headers], ZERO_RUN_VALUES)
 
 
 def make_figures_S1(df_final):
     """
-    Generates time-series plots for the Number of Farms.
-    Plots curves for each individual species AND a calculated 'All Species' curve.
+    Builds time-series charts for the Number of Farms (rendered by main.py).
+    Plots curves for each individual species, plus a calculated 'All Species'
+    curve on the EU chart. Returns a list of FigureJob specs.
     """
     if df_final.empty:
-        return
-
-    # Apply the global theme
-    Theme.apply_global()
+        return []
 
     # Filter for relevant sector
     df_farming = df_final[df_final["Fur Industry Sector"] == "Farming"].copy()
 
-    # Define output folder
-    figures_folder = OUTPUT_BASE_DIR / "figures"
-    figures_folder.mkdir(parents=True, exist_ok=True)
+    jobs = []
 
     # ---------------------------------------------------------
     # 1. Per Member State Plots
     # ---------------------------------------------------------
-    countries = df_farming["Country"].unique()
+    # Country × Species × Year cube: each Member State is a slice, not a filter over every row
+    cube = ProjectionCube.from_long(df_farming, "Number of Farms", axes=["Country", "Species", "Year"])
+    years = cube.coords["Year"].to_numpy()
+    after_2025 = years > 2025
+    # Species of every Member State, in order of appearance
+    species_by_ms = (
+        df_farming[["Country", "Species"]].drop_duplicates()
+        .groupby("Country", observed=True, sort=False)["Species"].agg(list)
+    )
     
-    for ms in countries:
-        df_ms = df_farming[df_farming["Country"] == ms]
-        
-        # Calculate "All Species" aggregate for this MS
-        df_ms_agg = df_ms.groupby("Year")["Number of Farms"].sum().reset_index()
+    for ms, species_list in species_by_ms.items():
+        ms_cube = cube.sel(Country=ms)
         
         # Check if there is any activity > 0 after 2025
         # (Using the aggregate to check viability)
-        if df_ms_agg[df_ms_agg["Year"] > 2025]["Number of Farms"].sum() <= 0:
+        if np.nansum(ms_cube.data[:, after_2025]) <= 0:
             continue
 
-        fig, ax = plt.subplots()
+        clean_ms = ms.replace(" ", "_")
+        job = FigureJob(
+            f"Amount_Fur_Companies_{clean_ms}_Farms.png",
+            title=f"Projected Number of Farms: {ms}",
+            ylabel="Number of Farms",
+            legend={"loc": "upper right"},
+            savefig_kwargs={"bbox_inches": "tight"}
+        )
 
         # A. Plot individual species
-        species_list = df_ms["Species"].unique()
         for spec in species_list:
-            df_spec = df_ms[df_ms["Species"] == spec].sort_values("Year")
+            values = ms_cube.sel(Species=spec).data
+            present = ~np.isnan(values)
             # Only plot species that have non-zero values at some point
-            if df_spec["Number of Farms"].sum() > 0:
-                ax.plot(
-                    df_spec["Year"], 
-                    df_spec["Number of Farms"], 
+            if values[present].sum() > 0:
+                job.add_line(
+                    years[present], 
+                    values[present], 
                     label=spec,
                     color=SPECIES_COLORS.get(spec, "#333333")
                 )
-
-        ax.set_title(f"Projected Number of Farms: {ms}")
-        ax.set_ylabel("Number of Farms")
-        ax.legend(loc="upper right")
-        
-        # Save figure
-        clean_ms = ms.replace(" ", "_")
-        plt.savefig(figures_folder / f"Amount_Fur_Companies_{clean_ms}_Farms.png", bbox_inches='tight')
-        plt.close(fig)
+        jobs.append(job)
 
     # ---------------------------------------------------------
     # 2. EU-27 Aggregate Plot
     # ---------------------------------------------------------
-    # Group by Year and Species to get EU totals per species
-    df_eu_species = df_farming.groupby(["Year", "Species"])["Number of Farms"].sum().reset_index()
-    # Group by Year to get EU total for "All Species"
-    df_eu_total = df_farming.groupby("Year")["Number of Farms"].sum().reset_index()
-
-    if not df_eu_total.empty and df_eu_total[df_eu_total["Year"] > 2025]["Number of Farms"].sum() > 0:
-        fig, ax = plt.subplots()
+    # Totals over Member States per species, and over species for "All Species"
+    eu_species = cube.sum("Country")
+    eu_present = ~np.isnan(cube.data).all(axis=0)
+    eu_total = eu_species.sum("Species").data
+
+    if eu_total[after_2025].sum() > 0:
+        job = FigureJob(
+            "Amount_Fur_Companies_EU_Total_Farms.png",
+            title="Projected Total Number of Farms in EU",
+            ylabel="Number of Farms",
+            legend={"loc": "upper right"},
+            savefig_kwargs={"bbox_inches": "tight"}
+        )
         
         # A. Plot individual species totals
-        for spec in df_eu_species["Species"].unique():
-            df_spec = df_eu_species[df_eu_species["Species"] == spec].sort_values("Year")
-            if df_spec["Number of Farms"].sum() > 0:
-                ax.plot(
-                    df_spec["Year"], 
-                    df_spec["Number of Farms"], 
+        for spec, values, present in zip(eu_species.coords["Species"], eu_species.data, eu_present):
+            if values[present].sum() > 0:
+                job.add_line(
+                    years[present], 
+                    values[present], 
                     label=spec,
                     color=SPECIES_COLORS.get(spec, "#333333")
                 )
 
         # B. Plot "All Species" total
-        ax.plot(
-            df_eu_total["Year"], 
-            df_eu_total["Number of Farms"], 
+        job.add_line(
+            years, 
+            eu_total, 
             label="All Species",
             color=SPECIES_COLORS.get("All Species", "#9467bd"),
             linewidth=3,
             alpha=0.8
         )
+        jobs.append(job)
 
-        ax.set_title("Projected Total Number of Farms in EU")
-        ax.set_ylabel("Number of Farms")
-        ax.legend(loc="upper right")
-        
-        plt.savefig(figures_folder / "Amount_Fur_Companies_EU_Total_Farms.png", bbox_inches='tight')
-        plt.close(fig)
\ No newline at end of file
+    return jobs
@@ -1,27 +1,206 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from pathlib import Path
-from sklearn.linear_model import TheilSenRegressor
+from cube import ProjectionCube
+from figure_jobs import FigureJob
+from theil_sen import batched_theil_sen
+from zero_runs import compress_zero_runs
 
-def run_projection_S1(df):
-    """Calculates historical and projected pelt production per Member State and species.
+# Projections of other indicators read by this one (see scheduler.py)
+UPSTREAM = []
+# Value columns whose zero years are stored as runs (see zero_runs.py)
+ZERO_RUN_VALUES = ['Pelts']
 
-    This function processes historical data (2010–2024) and applies specific 
-    legal phase-out or market-driven rules to project production until 2040.
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+BASE_YEAR = 2024
+HISTORICAL_YEARS = np.arange(2010, 2025)
+PROJECTION_YEARS = np.arange(2025, 2041)
+
+# Legal phase-outs, checked in order (the first matching rule applies).
+# "species": None applies the rule to every species of the country.
+# "start" is the first year with reduced production, "end" the first year without production.
+# Shapes (multiplier of the 2024 value):
+#   step    - full production until "end"
+#   linear  - straight-line decline from "start", reaching 0 at "end"
+#   halving - production halves every year from "start" until "end"
+PHASE_OUT_RULES = [
+    # Lithuania (LT) - Phase out by 2027
+    {"country": "Lithuania", "species": ["Mink", "Chinchilla"], "start": 2026, "end": 2027, "shape": "halving"},
+    # Latvia (LV) - Phase out by 2028 (mink), other species stop immediately
+    {"country": "Latvia", "species": ["Mink"], "start": 2026, "end": 2028, "shape": "linear"},
+    {"country": "Latvia", "species": None, "start": 2025, "end": 2025, "shape": "step"},
+    # Romania (RO) - Phase out by 2027
+    {"country": "Romania", "species": ["Mink", "Chinchilla"], "start": 2026, "end": 2027, "shape": "halving"},
+    # Poland (PL) - 8-year linear phase-out ending 2033
+    {"country": "Poland", "species": None, "start": 2026, "end": 2033, "shape": "linear"},
+]
+
+# Market-driven trend (Group C): maximum 20% decline, no growth allowed
+MIN_ANNUAL_RATE = -0.2
+MAX_ANNUAL_RATE = 0.0
+
+def complete_historical_grid(pelts_data, historical_years):
+    """Builds the complete Country × Species × Year grid of historical pelts.
+
+    Missing observations are filled with 0. When a (Country, Species, Year)
+    key appears more than once, the first observation is used.
+
+    Args:
+        pelts_data (pd.DataFrame): Rows with columns ["Country", "Year", "Species", "Pelts"].
+        historical_years (np.ndarray): Years of the grid.
+
+    Returns:
+        pd.DataFrame: One row per Country, Species and Year (in order of first
+            appearance of Country and Species) with columns
+            ["Country", "Species", "Year", "Pelts"].
+    """
+    grid_index = pd.MultiIndex.from_product(
+        [pelts_data['Country'].unique(), pelts_data['Species'].unique(), historical_years],
+        names=['Country', 'Species', 'Year']
+    )
+    observed = (
+        pelts_data.drop_duplicates(subset=['Country', 'Species', 'Year'], keep='first')
+        .set_index(['Country', 'Species', 'Year'])['Pelts']
+    )
+    return observed.reindex(grid_index, fill_value=0).reset_index()
+
+def fit_log_trends(historical_wide):
+    """Fits a Theil-Sen trend on (Year, log Pelts) to every Country/Species group.
+
+    Only years with positive production are used. All groups are fitted in one
+    batched pass (see theil_sen.py), matching sklearn's TheilSenRegressor.
+
+    Args:
+        historical_wide (pd.DataFrame): Historical pelts, one row per
+            (Country, Species) and one column per year.
+
+    Returns:
+        np.ndarray: Log-slope per group; NaN for groups with fewer than two active years.
+    """
+    pelts = historical_wide.to_numpy(dtype=float)
+    active = pelts > 0
+    log_pelts = np.log(np.where(active, pelts, 1.0))
+
+    _, slopes = batched_theil_sen(historical_wide.columns.to_numpy(dtype=float), log_pelts, active)
+    return slopes
+
+def phase_out_curve(rule, projection_years):
+    """Multiplier of the base-year value for every projection year under one phase-out rule.
+
+    "start" and "end" may also be arrays of sampled years (one per draw); the
+    curve then has shape [draw × projection year].
+    """
+    years = np.asarray(projection_years, dtype=float)
+    start = np.asarray(rule["start"], dtype=float)[..., np.newaxis]
+    end = np.asarray(rule["end"], dtype=float)[..., np.newaxis]
+
+    if rule["shape"] == "step":
+        curve = np.ones(np.broadcast_shapes(years.shape, end.shape))
+    elif rule["shape"] == "linear":
+        curve = np.clip((end - years) / (end - start + 1), 0.0, 1.0)
+    elif rule["shape"] == "halving":
+        curve = 0.5 ** np.maximum(years - start + 1, 0)
+    else:
+        raise ValueError(f"Unknown phase-out shape: {rule['shape']}")
+
+    return np.where(years >= end, 0.0, curve)
+
+def compile_phase_out_rules(countries, species, projection_years, rules=PHASE_OUT_RULES):
+    """Compiles the phase-out rules into a multiplier matrix.
+
+    Args:
+        countries (array-like): Country of every group.
+        species (array-like): Species of every group.
+        projection_years (np.ndarray): Years to project.
+        rules (list): Phase-out rules (see PHASE_OUT_RULES).
+
+    Returns:
+        tuple: (multipliers, has_rule) where multipliers has shape
+            [group × projection year] ([draw × group × projection year] if the
+            rules hold sampled years) and has_rule flags groups covered by a rule.
+    """
+    countries = np.asarray(countries)
+    species = np.asarray(species)
+    curves = [phase_out_curve(rule, projection_years) for rule in rules]
+    draw_shape = np.broadcast_shapes(*(curve.shape[:-1] for curve in curves))
+    multipliers = np.ones(draw_shape + (len(countries), len(projection_years)))
+    has_rule = np.zeros(len(countries), dtype=bool)
+
+    for rule, curve in zip(rules, curves):
+        match = (countries == rule["country"]) & ~has_rule
+        if rule["species"] is not None:
+            match &= np.isin(species, rule["species"])
+        multipliers[..., match, :] = curve[..., np.newaxis, :]
+        has_rule |= match
+
+    return multipliers, has_rule
+
+def project_groups(historical_wide, projection_years, out=None, min_rate=MIN_ANNUAL_RATE,
+                   max_rate=MAX_ANNUAL_RATE, rules=PHASE_OUT_RULES, slopes=None):
+    """Projects every Country/Species group from its 2024 value in one array operation.
+
+    Groups without production in 2024 stay at 0. Groups covered by a legal
+    phase-out follow its multiplier curve; all other groups (Group C) follow
+    their Theil-Sen CAGR, clamped to [min_rate, max_rate] (flat if fewer than
+    two active years).
+
+    The rate bounds and rule years may be arrays with one value per draw
+    (see sensitivity.py); the projection then gets a leading draw dimension.
+
+    Args:
+        historical_wide (pd.DataFrame): Historical pelts, one row per
+            (Country, Species) and one column per year up to BASE_YEAR.
+        projection_years (np.ndarray): Years to project.
+        out (np.ndarray, optional): Preallocated array of the result's shape
+            to write the projection into.
+        min_rate, max_rate (float or np.ndarray): CAGR bounds of Group C.
+        rules (list): Phase-out rules (see PHASE_OUT_RULES).
+        slopes (np.ndarray, optional): Result of fit_log_trends(historical_wide), if
+            already computed.
+
+    Returns:
+        np.ndarray: Projected pelts of shape [group × projection year]
+            ([draw × group × projection year] for sampled parameters).
+    """
+    base = historical_wide[BASE_YEAR].to_numpy(dtype=float)
+    multipliers, has_rule = compile_phase_out_rules(
+        historical_wide.index.get_level_values('Country'),
+        historical_wide.index.get_level_values('Species'),
+        projection_years,
+        rules
+    )
+
+    # Market-driven CAGR: rate = e^slope - 1, from the robust log-linear trend
+    if slopes is None:
+        slopes = fit_log_trends(historical_wide)
+    min_rate = np.asarray(min_rate, dtype=float)[..., np.newaxis]
+    max_rate = np.asarray(max_rate, dtype=float)[..., np.newaxis]
+    rates = np.clip(np.exp(slopes) - 1, min_rate, max_rate)
+    rates = np.where(np.isnan(rates), 0.0, rates)
+    trend = (1 + rates[..., np.newaxis]) ** (projection_years - BASE_YEAR)
+
+    projected = np.multiply(base[:, np.newaxis], np.where(has_rule[:, np.newaxis], multipliers, trend), out=out)
+    projected[..., base <= 0, :] = 0.0
+    return projected
+
+def prepare_history(df):
+    """Cleans the historical data into the complete 2010–2024 grid of every group.
+
+    The result does not depend on the scenario: the scenario runner computes it
+    once and passes it to the projection function of every scenario.
 
     Args:
         df (pd.DataFrame): Historical data with columns:
             ["Country", "Year", "Species", "Produced_Pelts_Number"].
 
     Returns:
-        pd.DataFrame: A combined DataFrame of historical and projected data (2010–2040)
-            with columns ["Country", "Species", "Year", "Pelts"].
+        pd.DataFrame: One row per (Country, Species) group, sorted by group, and
+            one column per historical year; None if there is no species data.
     """
     if df.empty:
-        return pd.DataFrame(columns=['Country', 'Species', 'Year', 'Pelts'])
+        return None
 
-    # --- 1. Data Cleaning and Preparation ---
     pelts_data = df.rename(columns={"Country": "Country", "Produced_Pelts_Number": "Pelts"})
     pelts_data["Year"] = pelts_data["Year"].astype(int)
     pelts_data["Pelts"] = pd.to_numeric(pelts_data["Pelts"], errors='coerce').fillna(0)
@@ -29,136 +208,86 @@ def run_projection_S1(df):
     # Filter out aggregate rows and keep only individual species
     pelts_data = pelts_data[pelts_data["Species"] != "All species"][['Country', 'Year', 'Species', 'Pelts']]
 
+    if pelts_data.empty:
+        return None
+
     # Ensure a complete grid for 2010–2024 (filling missing observations with 0)
-    historical_years = np.arange(2010, 2025)
-    member_states = pelts_data['Country'].unique()
-    species_list = pelts_data['Species'].unique()
-    
-    complete_historical_records = []
-    for ms in member_states:
-        for species in species_list:
-            subset = pelts_data[(pelts_data['Country'] == ms) & (pelts_data['Species'] == species)]
-            for year in historical_years:
-                # Extract value if year exists, otherwise default to 0
-                val = subset.loc[subset['Year'] == year, 'Pelts'].iloc[0] if year in subset['Year'].values else 0
-                complete_historical_records.append({'Country': ms, 'Species': species, 'Year': year, 'Pelts': val})
-    
-    historical_df = pd.DataFrame(complete_historical_records)
+    historical_df = complete_historical_grid(pelts_data, HISTORICAL_YEARS)
+
+    # One row per (Country, Species) group, sorted by group (also for Categorical keys), one column per year
+    return historical_df.set_index(['Country', 'Species', 'Year'])['Pelts'].unstack('Year').sort_index()
+
+def run_projection_S1(df, history=None):
+    """Calculates historical and projected pelt production per Member State and species.
+
+    This function processes historical data (2010–2024) and applies specific 
+    legal phase-out or market-driven rules to project production until 2040.
+
+    Args:
+        df (pd.DataFrame): Historical data with columns:
+            ["Country", "Year", "Species", "Produced_Pelts_Number"].
+        history (pd.DataFrame, optional): Result of prepare_history(df), if
+            already computed.
+
+    Returns:
+        pd.DataFrame: A combined DataFrame of historical and projected data (2010–2040)
+            with columns ["Country", "Species", "Year", "Pelts", "Run Length"];
+            runs of zero years (e.g. after a phase-out) are stored as one row
+            (see zero_runs.py).
+    """
+    # --- 1. Data Cleaning and Preparation ---
+    historical_wide = prepare_history(df) if history is None else history
+    if historical_wide is None:
+        return pd.DataFrame(columns=['Country', 'Species', 'Year', 'Pelts'])
+
+    historical_years = HISTORICAL_YEARS
+    countries = historical_wide.index.get_level_values('Country').to_numpy()
+    species = historical_wide.index.get_level_values('Species').to_numpy()
+
+    # Groups are sorted by Country, so each country's species rows are contiguous
+    n_groups = len(historical_wide)
+    country_starts = np.flatnonzero(np.r_[True, countries[1:] != countries[:-1]])
 
     # --- 2. Projection Logic ---
-    def apply_projection_rules(group_df):
-        """Applies Country-specific legal bans or CAGR trends to a single Country/Species group."""
-        group_df = group_df.sort_values('Year')
-        ms_name = group_df['Country'].iloc[0]
-        species_name = group_df['Species'].iloc[0]
-        last_observed_pelt_count = group_df['Pelts'].iloc[-1]
-        projection_years = np.arange(2025, 2041)
-
-        # A: Check for existing zero production
-        if last_observed_pelt_count <= 0:
-            projected_values = np.zeros_like(projection_years)
-
-        # B: Lithuania (LT) - Phase out by 2027
-        elif ms_name == "Lithuania" and species_name in ["Mink", "Chinchilla"]:
-            base_val = group_df.loc[group_df['Year'] == 2024, 'Pelts'].iloc[0] if 2024 in group_df['Year'].values else last_observed_pelt_count
-            projected_values = np.array([base_val, 0.5 * base_val] + [0] * (len(projection_years) - 2))
-
-        # C: Latvia (LV) - Phase out by 2028
-        elif ms_name == "Latvia" and species_name == "Mink":
-            base_val = group_df.loc[group_df['Year'] == 2024, 'Pelts'].iloc[0] if 2024 in group_df['Year'].values else last_observed_pelt_count
-            projected_values = np.array([base_val, (2/3) * base_val, (1/3) * base_val] + [0] * (len(projection_years) - 3))
-        elif ms_name == "Latvia" and species_name != "mink":
-            projected_values = np.zeros_like(projection_years)
-
-        # D: Romania (RO) - Phase out by 2027
-        elif ms_name == "Romania" and species_name in ["Mink", "Chinchilla"]:
-            base_val = group_df.loc[group_df['Year'] == 2024, 'Pelts'].iloc[0] if 2024 in group_df['Year'].values else last_observed_pelt_count
-            projected_values = np.array([base_val, 0.5 * base_val] + [0] * (len(projection_years) - 2))
-
-        # E: Poland (PL) - 8-year linear phase-out ending 2033
-        elif ms_name == "Poland":
-            base_val = group_df.loc[group_df['Year'] == 2024, 'Pelts'].iloc[0] if 2024 in group_df['Year'].values else last_observed_pelt_count
-            PHASE_OUT_START, PHASE_OUT_END = 2026, 2033
-            DURATION = PHASE_OUT_END - PHASE_OUT_START + 1
-            annual_reduction_step = base_val / DURATION
-            
-            projected_values = []
-            for year in projection_years:
-                if year == 2025:
-                    projected_values.append(base_val)
-                elif PHASE_OUT_START <= year <= PHASE_OUT_END:
-                    reduction = annual_reduction_step * (year - 2025)
-                    projected_values.append(max(base_val - reduction, 0))
-                else: # year > 2033
-                    projected_values.append(0)
-            projected_values = np.array(projected_values)
-
-        # F: Market-driven CAGR for all other MS (Group C)
-        else:
-            active_years = group_df[group_df['Pelts'] > 0]
-            if len(active_years) < 2:
-                projected_values = np.full_like(projection_years, last_observed_pelt_count, dtype=float)
-            else:
-                # start_yr, end_yr = active_years['Year'].iloc[0], active_years['Year'].iloc[-1]
-                # val_start, val_end = active_years['Pelts'].iloc[0], active_years['Pelts'].iloc[-1]
-                
-                # # Compound Annual Growth Rate
-                # cagr1 = (val_end / val_start)**(1 / (end_yr - start_yr)) - 1
-                # # Cap the trend: maximum 20% decline, no growth allowed
-                
-
-                # Theil-Sen Estimator ---
-                # We fit Theil-Sen on (Year, Log(Pelts)) to derive a robust CAGR
-                X = active_years[['Year']].values
-                y = np.log(active_years['Pelts'].values)
-
-                # Fit the robust regressor
-                model = TheilSenRegressor(random_state=42)
-                model.fit(X, y)
-                # Convert the log-slope back to a percentage rate: rate = e^slope - 1
-                cagr = np.exp(model.coef_[0]) - 1
-      
-                
-                clamped_rate = max(min(cagr, 0.0), -0.2)
-                projected_values = np.array([last_observed_pelt_count * (1 + clamped_rate)**(yr - 2024) for yr in projection_years])
-
-        future_df = pd.DataFrame({
-            'Country': ms_name, 
-            'Species': species_name, 
-            'Year': projection_years, 
-            'Pelts': projected_values
-        })
-        return pd.concat([group_df, future_df], ignore_index=True)
-
-    # Apply projection logic per group
-    final_projection = historical_df.groupby(['Country', 'Species'], group_keys=False).apply(apply_projection_rules).reset_index(drop=True)
-    
+    # One preallocated [row × year] block: species groups (historical + projected)
+    # followed by the "All Species" aggregate of every country
+    all_years = np.concatenate([historical_years, PROJECTION_YEARS])
+    n_hist, n_years = len(historical_years), len(all_years)
+    block = np.empty((n_groups + len(country_starts), n_years))
+    block[:n_groups, :n_hist] = historical_wide.to_numpy(dtype=float)
+    project_groups(historical_wide, PROJECTION_YEARS, out=block[:n_groups, n_hist:])
+
     # --- 3. Aggregate "All Species" total ---
     # Sum the pelts across all species for each Country and Year
-    agg_total = final_projection.groupby(['Country', 'Year'], as_index=False)['Pelts'].sum()
-    agg_total['Species'] = 'All Species'
-    
-    # Append the aggregate rows to the final dataframe
-    final_projection = pd.concat([final_projection, agg_total], ignore_index=True)
+    np.add.reduceat(block[:n_groups], country_starts, axis=0, out=block[n_groups:])
 
-    
-    return final_projection
+    # Wrap the block into the long format exactly once
+    row_countries = np.concatenate([countries, countries[country_starts]])
+    row_species = np.concatenate([species, np.full(len(country_starts), 'All Species', dtype=object)])
+    final_projection = pd.DataFrame({
+        'Country': np.repeat(row_countries, n_years),
+        'Species': np.repeat(row_species, n_years),
+        'Year': np.tile(all_years, len(block)),
+        'Pelts': block.ravel()
+    })
+
+    return compress_zero_runs(final_projection, ZERO_RUN_VALUES)
 
 def make_figures_S1(df_proj):
-    """Generates visualization charts for pelt production by country and EU total.
+    """Builds the visualization charts for pelt production by country and EU total.
 
-    Creates PNG charts for each Member State and one aggregate EU chart.
-    Y-axis values are normalized to thousands for readability. Plots are only
-    generated if there is non-zero production projected after 2024.
+    One chart per Member State and one aggregate EU chart. Y-axis values are
+    normalized to thousands for readability. Charts are only built if there
+    is non-zero production projected after 2024.
 
     Args:
         df_proj (pd.DataFrame): The combined historical and projected dataset.
+
+    Returns:
+        list: FigureJob specs, rendered by main.py (see figure_jobs.py).
     """
     if df_proj.empty:
-        return
-
-    output_dir = Path("data/output/S1_output/figures")
-    output_dir.mkdir(parents=True, exist_ok=True)
+        return []
 
     # Standardized color palette for species consistency
     SPECIES_COLORS = {
@@ -168,65 +297,68 @@ def make_figures_S1(df_proj):
         "Fox": "#d62728",
         "All Species": "#9467bd"
     }
+    jobs = []
 
-    # --- 1. Generate Individual Member State Plots ---
+    # --- 1. Individual Member State Plots ---
+    # Country × Species × Year cube: each Member State is a slice, not a filter over every row
+    cube = ProjectionCube.from_long(df_proj, 'Pelts', axes=['Country', 'Species', 'Year'])
+    post_2024 = cube.coords['Year'] > 2024
     for ms in df_proj['Country'].unique():
-        ms_data = df_proj[df_proj['Country'] == ms].groupby(['Year', 'Species'], as_index=False)['Pelts'].sum()
+        ms_cube = cube.sel(Country=ms)
         
         # Filtering logic: Only plot if at least one species has production > 0 after 2024
-        post_2024_data = ms_data[ms_data['Year'] > 2024]
-        if post_2024_data['Pelts'].sum() <= 0:
+        if np.nansum(ms_cube.data[:, post_2024]) <= 0:
             continue
 
-        pivot_data = ms_data.pivot(index='Year', columns='Species', values='Pelts').fillna(0)
+        pivot_data = ms_cube.to_frame(index='Year', columns='Species').fillna(0)
         
-        fig, ax = plt.subplots()
-        for species in pivot_data.columns:
+        job = FigureJob(
+            f"Amount_Of_Pelts_Produced_Per_{ms}_per_species.png",
+            title=f"Projected Pelt Production in {ms} (in Thousands of Pelts)",
+            xlabel="Year",
+            ylabel="Number of Pelts (Thousands)",
+            legend={},
+            grid={"linestyle": "--", "linewidth": 0.5},
+            tight_layout=True
+        )
+        for species, pelts in zip(pivot_data.columns, pivot_data.to_numpy().T):
             if species=="All Species":
                 continue
-            if pivot_data[species].sum() > 0:
+            if pelts.sum() > 0:
                 # Plotting values in thousands
-                ax.plot(
+                job.add_line(
                     pivot_data.index, 
-                    pivot_data[species] / 1000, 
+                    pelts / 1000, 
                     label=species, 
                     color=SPECIES_COLORS.get(species, "#1f77b4")
                 )
+        jobs.append(job)
 
-        ax.set_title(f"Projected Pelt Production in {ms} (in Thousands of Pelts)") 
-        ax.set_xlabel("Year")
-        ax.set_ylabel("Number of Pelts (Thousands)")
-        ax.legend()
-        ax.grid(True, linestyle="--", linewidth=0.5)
-
-        fig.tight_layout()
-        fig.savefig(output_dir / f"Amount_Of_Pelts_Produced_Per_{ms}_per_species.png")
-        plt.close(fig)
-
-    # --- 2. Generate Aggregate EU Total Plot ---
-    eu_totals = df_proj.groupby(['Year', 'Species'], as_index=False)['Pelts'].sum()
+    # --- 2. Aggregate EU Total Plot ---
+    eu_totals = cube.sum('Country')
     
     # Only generate EU plot if there is projected production post-2024
-    if eu_totals[eu_totals['Year'] > 2024]['Pelts'].sum() > 0:
-        eu_pivot = eu_totals.pivot(index='Year', columns='Species', values='Pelts').fillna(0)
+    if eu_totals.data[:, post_2024].sum() > 0:
+        eu_pivot = eu_totals.to_frame(index='Year', columns='Species').fillna(0)
 
-        fig, ax = plt.subplots()
+        job = FigureJob(
+            "Amount_Of_Pelts_Produced_Per_MS_EU_total_per_species.png",
+            title="Total Pelt Production in EU (in Thousands of Pelts)",
+            xlabel="Year",
+            ylabel="Number of Pelts (Thousands)",
+            legend={},
+            grid={"linestyle": "--", "linewidth": 0.5},
+            tight_layout=True
+        )
         for species in eu_pivot.columns:
             if eu_pivot[species].sum() > 0:
                 # Plotting values in thousands
-                ax.plot(
+                job.add_line(
                     eu_pivot.index, 
                     eu_pivot[species] / 1000, 
                     label=species, 
                     color=SPECIES_COLORS.get(species, "#1f77b4")
                 )
+        jobs.append(job)
 
-        ax.set_title("Total Pelt Production in EU (in Thousands of Pelts)")
-        ax.set_xlabel("Year")
-        ax.set_ylabel("Number of Pelts (Thousands)")
-        ax.legend()
-        ax.grid(True, linestyle="--", linewidth=0.5)
-
-        fig.tight_layout()
-        fig.savefig(output_dir / "Amount_Of_Pelts_Produced_Per_MS_EU_total_per_species.png")
-        plt.close(fig)
\ No newline at end of file
+    return jobs
@@ -7,17 +7,19 @@ Contains two public functions for scenario S1:
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
-import matplotlib.pyplot as plt
+from cube import ProjectionCube
+from figure_jobs import FigureJob, format_thousands
 from figure_theme import Theme
+from projection_registry import get_projection
 
 # ---------------------------------------------------------
-# CONSTANTS & FILE PATHS
+# CONSTANTS
 # ---------------------------------------------------------
-OUTPUT_BASE_DIR = Path("data/output/S1_output")
-PELTS_FILE = OUTPUT_BASE_DIR / "projected_data.xlsx"
 PELTS_SHEET = "Amount_Of_Pelts_Produced_Per_MS"
 
+# Projections of other indicators read by this one (see scheduler.py)
+UPSTREAM = [PELTS_SHEET]
+
 # Species to break down for Farming
 FARMING_SPECIES = ["Mink", "Fox", "Raccoon dog", "Chinchilla"]
 
@@ -49,6 +51,8 @@ INDICATOR_MAPPING = {
     )
 }
 
+INDICATOR_NAMES = list(INDICATOR_MAPPING.keys())
+
 TARGET_SECTORS = [
     "Feed", 
     "Farming", 
@@ -67,6 +71,121 @@ OPERATING_COSTS = {
     "Raccoon dog": 94.7
 }
 
+def scale_by_driver(values, driver, driver_base):
+    """values * driver / driver_base, 0 where the base driver is 0"""
+    has_base = driver_base > 0
+    return np.where(has_base, values * (driver / np.where(has_base, driver_base, 1)), 0.0)
+
+
+def project_sectors(val_2024, val_2028, total_pelts, years):
+    """
+    Trajectories of every sector and indicator as a [sector × indicator × year] array.
+
+    val_2024 and val_2028 have shape [sector × indicator × 1], total_pelts
+    [year]. val_2028 and total_pelts may carry a leading draw dimension (see
+    sensitivity.py); the result then has shape [draw × sector × indicator × year].
+    """
+    drivers = total_pelts[..., np.newaxis, np.newaxis, :]
+    pelts_2024 = drivers[..., years == 2024]
+    pelts_2028 = drivers[..., years == 2028]
+    draw_shape = np.broadcast_shapes(drivers.shape[:-3], val_2028.shape[:-3])
+    trajectory = np.empty(draw_shape + val_2024.shape[-3:-1] + (len(years),))
+
+    # 1. Backcasting (2010 - 2023)
+    backcast = years < 2024
+    trajectory[..., backcast] = scale_by_driver(val_2024, drivers[..., backcast], pelts_2024)
+
+    # 2. Interpolation (2024 - 2028)
+    interpolated = (years > 2024) & (years < 2028)
+    trajectory[..., years == 2024] = val_2024
+    trajectory[..., interpolated] = val_2024 + (val_2028 - val_2024) * (years[interpolated] - 2024) / 4.0
+    trajectory[..., years == 2028] = val_2028
+
+    # 3. Scaling (2029 - 2040)
+    scaled = years > 2028
+    trajectory[..., scaled] = scale_by_driver(val_2028, drivers[..., scaled], pelts_2028)
+    return trajectory
+
+
+def split_farming(farming, total_pelts, species_pelts, operating_costs):
+    """
+    Species breakdown of the Farming (All Species) trajectory.
+
+    Args:
+        farming (np.ndarray): Farming trajectory, [indicator × year].
+        total_pelts (np.ndarray): Total EU pelts, [year].
+        species_pelts (np.ndarray): EU pelts of FARMING_SPECIES, [species × year].
+        operating_costs (np.ndarray): Operating costs per pelt of FARMING_SPECIES, [species].
+        All arguments may carry a leading draw dimension (see sensitivity.py).
+
+    Returns:
+        tuple: (species_values [species × indicator × year], allocated_costs [species × year])
+    """
+    # Share for general indicators (based on production volume), shape [species × year]
+    has_production = (total_pelts > 0)[..., np.newaxis, :]
+    share = np.where(
+        has_production, species_pelts / np.where(has_production, total_pelts[..., np.newaxis, :], 1), 0.0
+    )
+    species_values = farming[..., np.newaxis, :, :] * share[..., :, np.newaxis, :]
+
+    # Operating costs: apportion the implied total cost (Value - Profit) by the
+    # variable cost pool, CostVar_s,t = OC_s * Prod_EU,s,t
+    species_var_costs = species_pelts * operating_costs[..., np.newaxis]
+    total_var_cost_pool = species_var_costs.sum(axis=-2)[..., np.newaxis, :]
+    implied_total_cost_million = (
+        farming[..., INDICATOR_NAMES.index("Value (in million €)"), :]
+        - farming[..., INDICATOR_NAMES.index("Profit (in million €)"), :]
+    )[..., np.newaxis, :]
+    has_pool = total_var_cost_pool > 0
+    cost_share = species_var_costs / np.where(has_pool, total_var_cost_pool, 1)
+    allocated_costs = np.where(has_pool, implied_total_cost_million * cost_share, 0.0)
+    return species_values, allocated_costs
+
+
+def ratio_of_jobs_to_value(values):
+    """FTE employment per € million turnover along the indicator axis (0 where turnover is 0)"""
+    jobs = values[..., INDICATOR_NAMES.index("Number of jobs"), :]
+    turnover = values[..., INDICATOR_NAMES.index("Value (in million €)"), :]
+    has_turnover = turnover != 0
+    return np.where(has_turnover, jobs / np.where(has_turnover, turnover, 1), 0.0)
+
+
+def sector_baseline(df_input):
+    """
+    2024 baseline and 2028 target of every target sector present in the input
+    (EU, All Species, first row per sector).
+
+    Returns:
+        tuple: (sectors, val_2024, val_2028), the values as [sector × indicator × 1]
+            arrays (missing columns count as 0); sectors is empty if none is present.
+    """
+    df_baseline = df_input[
+        (df_input["Country"] == "European Union") &
+        (df_input["Species"] == "All Species") &
+        (df_input["Year"] == 2024)
+    ].copy()
+
+    # First baseline row of every target sector present in the input
+    df_baseline = df_baseline[df_baseline["Fur Industry Sector"].isin(TARGET_SECTORS)]
+    df_baseline = df_baseline.drop_duplicates(subset="Fur Industry Sector").set_index("Fur Industry Sector")
+    sectors = [sector for sector in TARGET_SECTORS if sector in df_baseline.index]
+    if not sectors:
+        return sectors, None, None
+    df_baseline = df_baseline.loc[sectors]
+
+    def baseline_values(columns):
+        """[sector × indicator] matrix of input columns (missing columns count as 0)"""
+        return np.column_stack([
+            pd.to_numeric(df_baseline[col], errors="coerce").to_numpy(dtype=float)
+            if col in df_baseline.columns else np.zeros(len(sectors))
+            for col in columns
+        ])
+
+    val_2024 = baseline_values([col_2024 for col_2024, _ in INDICATOR_MAPPING.values()])[:, :, np.newaxis]
+    val_2028 = baseline_values([col_2028 for _, col_2028 in INDICATOR_MAPPING.values()])[:, :, np.newaxis]
+    return sectors, val_2024, val_2028
+
+
 def run_projection_S1(df_input):
     """
     Projects economic indicators (Value, Jobs, Profit, etc.) for the Fur Industry.
@@ -82,181 +201,28 @@ def run_projection_S1(df_input):
     # ---------------------------------------------------------
     # 1. Load Drivers (EU Pelt Production)
     # ---------------------------------------------------------
-    if not PELTS_FILE.exists():
-        print(f"[WARNING] {PELTS_FILE} not found. Cannot run ID19 projection.")
+    df_pelts = get_projection(PELTS_SHEET)
+    if df_pelts is None:
+        print(f"[WARNING] Projection {PELTS_SHEET} not available. Cannot run ID19 projection.")
         return pd.DataFrame()
 
-    try:
-        df_pelts = pd.read_excel(PELTS_FILE, sheet_name=PELTS_SHEET)
-    except ValueError:
-        print(f"[WARNING] Sheet {PELTS_SHEET} not found in {PELTS_FILE}.")
-        return pd.DataFrame()
+    years = np.arange(2010, 2041)
 
-    # Pre-calculate aggregated pelts for lookups
+    # Pre-calculate aggregated pelts as year vectors
     # 1. Total EU Pelts (All Species) per year
-    total_pelts_series = df_pelts.groupby("Year")["Pelts"].sum()
-    
-    # 2. Total EU Pelts per Species per year
-    species_pelts_df = df_pelts.groupby(["Year", "Species"])["Pelts"].sum()
+    total_pelts = df_pelts.groupby("Year")["Pelts"].sum().reindex(years, fill_value=0).to_numpy(dtype=float)
 
-    def get_total_pelts(year):
-        return total_pelts_series.get(year, 0)
-    
-    def get_species_pelts(year, species):
-        # Handle potential case sensitivity or missing species
-        try:
-            return species_pelts_df.loc[(year, species)]
-        except KeyError:
-            # Fallback for capitalization differences
-            try:
-                return species_pelts_df.loc[(year, species.lower())]
-            except KeyError:
-                return 0
-
-    pelts_2024 = get_total_pelts(2024) 
-    pelts_2028 = get_total_pelts(2028) 
+    # 2. Total EU Pelts per Species per year, shape [species × year]
+    #    (falls back to the lowercase species name for capitalization differences)
+    species_by_year = df_pelts.groupby(["Year", "Species"], observed=True)["Pelts"].sum().unstack("Species").reindex(index=years)
+    exact = species_by_year.reindex(columns=FARMING_SPECIES).to_numpy(dtype=float)
+    lower = species_by_year.reindex(columns=[sp.lower() for sp in FARMING_SPECIES]).to_numpy(dtype=float)
+    species_pelts = np.where(np.isnan(exact), lower, exact)
+    species_pelts = np.nan_to_num(species_pelts, nan=0.0).T
 
     # ---------------------------------------------------------
     # 2. Prepare Input Data (Baseline 2024 & Target 2028)
     # ---------------------------------------------------------
-    df_baseline = df_input[
-        (df_input["Country"] == "European Union") &
-        (df_input["Species"] == "All Species") &
-        (df_input["Year"] == 2024)
-    ].copy()
-
-    # ---------------------------------------------------------
-    # 3. Generate Projections (2010 - 2040)
-    # ---------------------------------------------------------
-    projection_rows = []
-    years_range = range(2010, 2041)
-
-    for sector in TARGET_SECTORS:
-        sector_row = df_baseline[df_baseline["Fur Industry Sector"] == sector]
-        
-        if sector_row.empty:
-            continue
-            
-        sector_row = sector_row.iloc[0]
-        
-        # --- A. Calculate "All Species" Trajectory for this Sector ---
-        sector_trajectory = {y: {} for y in years_range}
-
-        for out_col, (col_2024, col_2028) in INDICATOR_MAPPING.items():
-            val_2024 = pd.to_numeric(sector_row.get(col_2024, 0), errors="coerce") or 0
-            val_2028_target = pd.to_numeric(sector_row.get(col_2028, 0), errors="coerce") or 0
-
-            # 1. Backcasting (2010 - 2023)
-            for t in range(2010, 2024):
-                pelts_t = get_total_pelts(t)
-                val_t = val_2024 * (pelts_t / pelts_2024) if pelts_2024 > 0 else 0
-                sector_trajectory[t][out_col] = val_t
-
-            # 2. Interpolation (2024 - 2028)
-            for t in range(2024, 2029):
-                if t == 2024: val_t = val_2024
-                elif t == 2028: val_t = val_2028_target
-                else: val_t = val_2024 + (val_2028_target - val_2024) * (t - 2024) / 4.0
-                sector_trajectory[t][out_col] = val_t
-
-            # 3. Scaling (2029 - 2040)
-            base_val_Scaling = val_2028_target
-            for t in range(2029, 2041):
-                pelts_t = get_total_pelts(t)
-                val_t = base_val_Scaling * (pelts_t / pelts_2028) if pelts_2028 > 0 else 0
-                sector_trajectory[t][out_col] = val_t
-
-        # --- B. Create Rows for "All Species" ---
-        for t in years_range:
-            row_data = {
-                "Country": "European Union",
-                "Species": "All Species",
-                "Fur Industry Sector": sector,
-                "Year": t
-            }
-            # Fill indicators
-            for ind_name in INDICATOR_MAPPING.keys():
-                row_data[ind_name] = sector_trajectory[t][ind_name]
-            
-            # Calculate Ratio
-            jobs = row_data.get("Number of jobs", 0)
-            turnover = row_data.get("Value (in million €)", 0)
-            row_data["Ratio of FTE employment to sector turnover (€ million)"] = jobs / turnover if turnover != 0 else 0
-
-            projection_rows.append(row_data)
-
-            # --- C. Create Rows for Specific Species (Farming Only) ---
-            # --- C. Create Rows for Specific Species (Farming Only) ---
-            if sector == "Farming":
-                # Get total "All Species" values for this year (in Million €)
-                total_farming_vals = sector_trajectory[t]
-                total_prod_eu_t = get_total_pelts(t)
-
-                # --- NEW LOGIC: Calculate Total Cost Pool & Apportionment ---
-                # 1. Calculate Total Variable Cost Pool (Sum of Species Pelts * OC per pelt)
-                total_var_cost_pool = 0
-                species_var_costs = {}
-                
-                for species in FARMING_SPECIES:
-                    s_pelts = get_species_pelts(t, species)
-                    oc = OPERATING_COSTS.get(species, 0)
-                    
-                    # CostVar_Farming,s,t = OC_s * Prod_EU,s,t
-                    # Result is in raw EUR (not millions), but relative scale is what matters
-                    cost_var = s_pelts * oc
-                    species_var_costs[species] = cost_var
-                    total_var_cost_pool += cost_var
-                
-                # 2. Get Implied Total Cost (Million €) from Aggregate Accounts
-                # Total Cost = Value - Profit
-                val_total_m = total_farming_vals.get("Value (in million €)", 0)
-                prof_total_m = total_farming_vals.get("Profit (in million €)", 0)
-                implied_total_cost_million = val_total_m - prof_total_m
-
-                # 3. Generate Species Rows
-                for species in FARMING_SPECIES:
-                    prod_eu_s_t = get_species_pelts(t, species)
-                    
-                    # Share for general indicators (based on production volume)
-                    share = prod_eu_s_t / total_prod_eu_t if total_prod_eu_t > 0 else 0
-
-                    spec_row_data = {
-                        "Country": "European Union",
-                        "Species": species,
-                        "Fur Industry Sector": "Farming",
-                        "Year": t
-                    }
-                    
-                    # Apportion Standard Indicators
-                    for ind_name in INDICATOR_MAPPING.keys():
-                        total_val = total_farming_vals.get(ind_name, 0)
-                        spec_row_data[ind_name] = total_val * share
-                    
-                    # Recalculate Ratio
-                    s_jobs = spec_row_data.get("Number of jobs", 0)
-                    s_val = spec_row_data.get("Value (in million €)", 0)
-                    spec_row_data["Ratio of FTE employment to sector turnover (€ million)"] = s_jobs / s_val if s_val != 0 else 0
-                    
-                    # --- NEW COLUMN: Operating Costs (in million €) ---
-                    # Cost_Farming,s,t = ScaleCost_t * CostVar_Farming,s,t
-                    # Equivalent to: ImpliedTotalCost * (SpeciesVarCost / TotalVarCostPool)
-                    s_var_cost = species_var_costs.get(species, 0)
-                    
-                    if total_var_cost_pool > 0:
-                        cost_share = s_var_cost / total_var_cost_pool
-                        allocated_cost = implied_total_cost_million * cost_share
-                    else:
-                        allocated_cost = 0
-                        
-                    spec_row_data["Operating Costs (in million €)"] = allocated_cost
-                    
-                    projection_rows.append(spec_row_data)
-
-    # ---------------------------------------------------------
-    # 4. Final Formatting
-    # ---------------------------------------------------------
-    df_projection = pd.DataFrame(projection_rows)
-    
     output_headers = [
         "Country", "Species", "Fur Industry Sector", "Year", 
         "Produced Quantity (in tonnes)", "Value (in million €)", 
@@ -265,29 +231,68 @@ def run_projection_S1(df_input):
         "Tax Returns (in million €)", "Operating Costs (in million €)"
     ]
 
-    if df_projection.empty:
+    sectors, val_2024, val_2028 = sector_baseline(df_input)
+    if not sectors:
         return pd.DataFrame(columns=output_headers)
 
+    # ---------------------------------------------------------
+    # 3. Generate Projections (2010 - 2040) as a [sector × indicator × year] array
+    # ---------------------------------------------------------
+    trajectory = project_sectors(val_2024, val_2028, total_pelts, years)
+
+    # --- Species breakdown (Farming only) ---
+    if "Farming" in sectors:
+        operating_costs = np.array([OPERATING_COSTS.get(sp, 0) for sp in FARMING_SPECIES], dtype=float)
+        species_values, allocated_costs = split_farming(
+            trajectory[sectors.index("Farming")], total_pelts, species_pelts, operating_costs
+        )
+
+    # ---------------------------------------------------------
+    # 4. Final Formatting
+    # ---------------------------------------------------------
+    # Per sector and year: the "All Species" row, followed for Farming by one row per species
+    blocks = []
+    for s_idx, sector in enumerate(sectors):
+        values = trajectory[s_idx].T[:, np.newaxis, :]                       # [year × 1 × indicator]
+        ratios = ratio_of_jobs_to_value(trajectory[s_idx]).T[:, np.newaxis]  # [year × 1]
+        costs = np.full(ratios.shape, np.nan)
+        row_species = ["All Species"]
+
+        if sector == "Farming":
+            values = np.concatenate([values, species_values.transpose(2, 0, 1)], axis=1)
+            ratios = np.concatenate([ratios, ratio_of_jobs_to_value(species_values).T], axis=1)
+            costs = np.concatenate([costs, allocated_costs.T], axis=1)
+            row_species = row_species + FARMING_SPECIES
+
+        n_rows = len(years) * len(row_species)
+        block = pd.DataFrame(values.reshape(n_rows, len(INDICATOR_NAMES)), columns=INDICATOR_NAMES)
+        block.insert(0, "Country", "European Union")
+        block.insert(1, "Species", np.tile(row_species, len(years)))
+        block.insert(2, "Fur Industry Sector", sector)
+        block.insert(3, "Year", np.repeat(years, len(row_species)))
+        block["Ratio of FTE employment to sector turnover (€ million)"] = ratios.ravel()
+        block["Operating Costs (in million €)"] = costs.ravel()
+        blocks.append(block)
+
+    df_projection = pd.concat(blocks, ignore_index=True)
     return df_projection[output_headers]
 
 
 def make_figures_S1(df):
     """
-    Generates figures for ID19.
+    Builds the figures for ID19 (rendered by main.py).
     1. Stacked Bar Charts (All Sectors combined) for each indicator.
     2. Line Charts (Farming Only) per species for each indicator.
+    Returns a list of FigureJob specs.
     """
     if df.empty:
-        return
-
-    Theme.apply_global()
-    output_dir = Path("data/output/S1_output/figures")
-    output_dir.mkdir(parents=True, exist_ok=True)
+        return []
 
     # Filter for EU
     df_eu = df[df["Country"] == "European Union"].copy()
     if df_eu.empty:
-        return
+        return []
+    jobs = []
 
     # List of indicators to plot
     # (Column Name, Filename Suffix, Y-Axis Label)
@@ -307,10 +312,14 @@ def make_figures_S1(df):
     # 1. Stacked Bar Charts (Specific Sector Filtering)
     # ---------------------------------------------------------
     df_all_spec = df_eu[df_eu["Species"] == "All Species"].copy()
+    # Indicator × Sector × Year cube of the "All Species" rows
+    sector_cube = ProjectionCube.from_long(
+        df_all_spec, [col for col, _, _ in indicators], axes=["Fur Industry Sector", "Year"]
+    )
 
     for col, suffix, ylabel in indicators:
-        # Pivot: Index=Year, Columns=Sector, Values=Indicator
-        pivot_df = df_all_spec.pivot_table(index="Year", columns="Fur Industry Sector", values=col, aggfunc="sum").fillna(0)
+        # Table: Index=Year, Columns=Sector, Values=Indicator
+        pivot_df = sector_cube.sel(Variable=col).to_frame(index="Year", columns="Fur Industry Sector", dropna=False).fillna(0)
         
         # --- LOGIC CHANGE: Filter Sectors based on Indicator ---
         if suffix == "Quantity":
@@ -332,22 +341,19 @@ def make_figures_S1(df):
         if pivot_df.sum().sum() == 0:
             continue
 
-        fig, ax = plt.subplots()
-        
+        job = FigureJob(
+            f"ID19_Fur_Industry_{suffix}_Stacked.png",
+            title=f"Projected EU Fur Industry {suffix}",
+            ylabel=ylabel,
+            xlabel="Year",
+            legend={"title": "Sector", "bbox_to_anchor": (1.05, 1), "loc": "upper left"},
+            x_rotation=45,
+            y_formatter=format_thousands,
+            tight_layout=True
+        )
         # --- LOGIC CHANGE: Removed log=True ---
-        pivot_df.plot(kind='bar', stacked=True, ax=ax, width=0.8)
-
-        ax.set_title(f"Projected EU Fur Industry {suffix}")
-        ax.set_ylabel(ylabel)
-        ax.set_xlabel("Year")
-        ax.legend(title="Sector", bbox_to_anchor=(1.05, 1), loc='upper left')
-        
-        plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
-        ax.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x:,.0f}'))
-
-        plt.tight_layout()
-        plt.savefig(output_dir / f"ID19_Fur_Industry_{suffix}_Stacked.png")
-        plt.close(fig)
+        job.set_stacked_bars(pivot_df, width=0.8)
+        jobs.append(job)
 
     # ---------------------------------------------------------
     # 2. Line Charts (Farming Only, Per Species)
@@ -359,31 +365,35 @@ def make_figures_S1(df):
     ].copy()
 
     if not df_farming.empty:
+        # Indicator × Species × Year cube of the species rows
+        species_cube = ProjectionCube.from_long(
+            df_farming, [col for col, _, _ in indicators], axes=["Species", "Year"]
+        )
         for col, suffix, ylabel in indicators:
             # Check if data exists
             if df_farming[col].sum() == 0:
                 continue
 
-            fig, ax = plt.subplots()
+            job = FigureJob(
+                f"ID19_Farming_{suffix}_by_Species.png",
+                title=f"Farming {suffix} by Species",
+                ylabel=ylabel,
+                xlabel="Year",
+                legend={"loc": "upper right"},
+                y_formatter=format_thousands,
+                tight_layout=True
+            )
             
-            # Pivot for plotting: Index=Year, Columns=Species
-            pivot_species = df_farming.pivot_table(index="Year", columns="Species", values=col, aggfunc="sum").fillna(0)
+            # Table for plotting: Index=Year, Columns=Species
+            pivot_species = species_cube.sel(Variable=col).to_frame(index="Year", columns="Species", dropna=False).fillna(0)
             
             for species in pivot_species.columns:
-                ax.plot(
+                job.add_line(
                     pivot_species.index, 
                     pivot_species[species], 
                     label=species, 
                     color=Theme.COLORS.get(species, "#333333")
                 )
+            jobs.append(job)
 
-            ax.set_title(f"Farming {suffix} by Species")
-            ax.set_ylabel(ylabel)
-            ax.set_xlabel("Year")
-            ax.legend(loc="upper right")
-            
-            ax.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x:,.0f}'))
-            
-            plt.tight_layout()
-            plt.savefig(output_dir / f"ID19_Farming_{suffix}_by_Species.png")
-            plt.close(fig)
\ No newline at end of file
+    return jobs
@@ -5,18 +5,23 @@ Contains two public functions for scenario S1:
 - make_figures_S1(df)
 """
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from pathlib import Path
-from figure_theme import Theme
+from cube import ProjectionCube
+from figure_jobs import FigureJob
+from projection_registry import get_projection
+from zero_runs import RUN_LENGTH, compress_zero_runs
 
 # ---------------------------------------------------------
-# CONSTANTS & FILE PATHS
+# CONSTANTS
 # ---------------------------------------------------------
-OUTPUT_BASE_DIR = Path("data/output/S1_output")
-PROJECTED_FARMS_FILE = OUTPUT_BASE_DIR / "projected_data.xlsx"
 FARMS_SHEET = "Amount_Fur_Companies_Per_MS"
 
+# Projections of other indicators read by this one (see scheduler.py)
+UPSTREAM = [FARMS_SHEET]
+# Value columns whose zero years are stored as runs (see zero_runs.py)
+ZERO_RUN_VALUES = ["Value"]
+
 # Species specific colors for consistency
 SPECIES_COLORS = {
     "Mink": "#1f77b4",
@@ -26,6 +31,21 @@ SPECIES_COLORS = {
     "All Species": "#9467bd"
 }
 
+# Land occupation of the farms is the 2024 EU total of these sectors
+LAND_SECTORS = ["Feed", "Other farm inputs"]
+
+
+def agricultural_land_2024(df_historical):
+    """Total EU Agricultural Land Occupation of LAND_SECTORS in 2024 (km2)"""
+    land_data_2024 = df_historical[
+        (df_historical["Year"] == 2024) &
+        (df_historical["Species"] == "All Species") &
+        (df_historical["Fur Industry Sector"].isin(LAND_SECTORS)) & 
+        (df_historical["Environmental Metric"] == "Agricultural land occupation")
+    ]
+    return land_data_2024["Value"].sum()
+
+
 def run_projection_S1(df_historical):
     """
     Projects Agricultural Land Occupation per species based on projected number of farms.
@@ -40,41 +60,32 @@ def run_projection_S1(df_historical):
     # ---------------------------------------------------------
     # 1. Load Projected Farms Data (The Driver)
     # ---------------------------------------------------------
-    if not PROJECTED_FARMS_FILE.exists():
+    df_farms = get_projection(FARMS_SHEET)
+    if df_farms is None:
         raise FileNotFoundError(
-            f"Could not find {PROJECTED_FARMS_FILE}. "
+            f"Projection {FARMS_SHEET} is not available. "
             "The farm projection (Amount_Fur_Companies_Per_MS) must run before ID28."
         )
 
-    df_farms = pd.read_excel(PROJECTED_FARMS_FILE, sheet_name=FARMS_SHEET)
-
     # ---------------------------------------------------------
     # 2. Calculate Baseline Metrics (2024)
     # ---------------------------------------------------------
     
     # A. Calculate Total Agricultural Land Occupation in EU (2024)
-    target_sectors = ["Feed", "Other farm inputs"]
-    
-    land_data_2024 = df_historical[
-        (df_historical["Year"] == 2024) &
-        (df_historical["Species"] == "All Species") &
-        (df_historical["Fur Industry Sector"].isin(target_sectors)) & 
-        (df_historical["Environmental Metric"] == "Agricultural land occupation")
-    ]
-    
-    total_agricultural_land_occupation = land_data_2024["Value"].sum()
+    total_agricultural_land_occupation = agricultural_land_2024(df_historical)
     
     if total_agricultural_land_occupation == 0:
         print("[WARNING] Total Agricultural Land Occupation for 2024 is 0. Check input data.")
 
     # B. Calculate Total Number of Farms in EU (2024)
-    # Filter for Farming sector and sum All Species to get the baseline divisor
-    farms_2024_rows = df_farms[
-        (df_farms["Year"] == 2024) &
-        (df_farms["Fur Industry Sector"] == "Farming")
+    # Species-specific Farming rows only: pre-calculated 'All Species' aggregates
+    # would otherwise be counted twice
+    species_farms = df_farms[
+        (df_farms["Fur Industry Sector"] == "Farming") &
+        (df_farms["Species"].str.lower() != "all species")
     ]
-    
-    total_farms_EU_2024 = farms_2024_rows["Number of Farms"].sum()
+
+    total_farms_EU_2024 = species_farms.loc[species_farms["Year"] == 2024, "Number of Farms"].sum()
 
     # C. Calculate Coefficient (Land Occupation per Farm)
     if total_farms_EU_2024 > 0:
@@ -85,137 +96,129 @@ def run_projection_S1(df_historical):
     # ---------------------------------------------------------
     # 3. Generate Projections (2010 - 2040) per Species
     # ---------------------------------------------------------
-    projection_rows = []
-    
-    # We iterate through the existing Farm Projections (species-specific)
-    target_farm_data = df_farms[
-        (df_farms["Fur Industry Sector"] == "Farming") &
-        (df_farms["Species"].str.lower() != "All Species")
-    ]
+    # Apply the global coefficient to the species farm counts of every Member State and year
+    target_farm_data = species_farms[species_farms["Country"] != "European Union"]
+    n_farms = pd.to_numeric(target_farm_data["Number of Farms"], errors="coerce")
+    # Runs of years without farms stay runs of years without land (see zero_runs.py)
+    runs = [RUN_LENGTH] if RUN_LENGTH in target_farm_data.columns else []
+
+    df_projection = target_farm_data[["Country", "Species", "Year"] + runs].assign(
+        **{
+            "Environmental Metric": "Agricultural land occupation",
+            "Fur Industry Sector": "Farming",
+            "Value": n_farms * agricultural_land_occupation_per_farm,
+            "Metric Unit": "km2"
+        }
+    ).reset_index(drop=True)
 
-    for _, row in target_farm_data.iterrows():
-        country = row["Country"]
-        year = row["Year"]
-        species = row["Species"]
-        n_farms = pd.to_numeric(row["Number of Farms"], errors='coerce') or 0
-        
-        if country == "European Union":
-            continue
-
-        # Apply the global coefficient to specific species farm counts
-        projected_land_value = n_farms * agricultural_land_occupation_per_farm
-        
-        # Create output row matching the output_headers structure exactly
-        projection_rows.append({
-            "Country": country,
-            "Environmental Metric": "Agricultural land occupation", # Added
-            "Species": species,
-            "Fur Industry Sector": "Farming",                   # Added
-            "Value": projected_land_value,
-            "Metric Unit": "km2",                                   # Changed from 'Unit'
-            "Year": year
-        })
-
-
-    df_projection = pd.DataFrame(projection_rows)
-    
     output_headers = [
         "Country", "Environmental Metric", "Species", 
         "Fur Industry Sector", "Value", "Metric Unit", "Year"
     ]
     
-    return df_projection[output_headers]
+    return compress_zero_runs(df_projection[output_headers + runs], ZERO_RUN_VALUES)
 
 
 def make_figures_S1(df_proj):
     """
-    Generates figures for Agricultural Land Occupation.
+    Builds the figures for Agricultural Land Occupation (rendered by main.py).
     Plots individual species and an aggregated 'All Species' curve.
+    Returns a list of FigureJob specs.
     """
     if df_proj.empty:
-        return
+        return []
 
-    Theme.apply_global()
-    output_figures_dir = OUTPUT_BASE_DIR / "figures"
-    output_figures_dir.mkdir(parents=True, exist_ok=True)
+    jobs = []
 
     # ---------------------------------------------------------
     # 1. Per Member State Plots
     # ---------------------------------------------------------
-    countries = df_proj["Country"].unique()
+    # Country × Species × Year cube: each Member State is a slice, not a filter over every row
+    cube = ProjectionCube.from_long(df_proj, "Value", axes=["Country", "Species", "Year"])
+    years = cube.coords["Year"].to_numpy()
+    after_2025 = years > 2025
+    # Species of every Member State, in order of appearance
+    species_by_ms = (
+        df_proj[["Country", "Species"]].drop_duplicates()
+        .groupby("Country", observed=True, sort=False)["Species"].agg(list)
+    )
     
-    for ms in countries:
-        df_ms = df_proj[df_proj["Country"] == ms]
+    for ms, species_list in species_by_ms.items():
+        ms_cube = cube.sel(Country=ms)
         
-        # Calculate aggregate for plotting only
-        df_ms_agg = df_ms.groupby("Year")["Value"].sum().reset_index()
+        # Calculate aggregate for plotting only (years with values of this Member State)
+        ms_present = ~np.isnan(ms_cube.data).all(axis=0)
+        ms_total = ms_cube.sum("Species").data
         
         # Only plot if there is activity after 2025
-        if df_ms_agg[df_ms_agg["Year"] > 2025]["Value"].sum() <= 0:
+        if ms_total[after_2025].sum() <= 0:
             continue
 
-        fig, ax = plt.subplots()
+        clean_ms = ms.replace(" ", "_")
+        job = FigureJob(
+            f"ID28_AgriculturalLandOccupation_{clean_ms}.png",
+            title=f"Projected Agricultural Land Occupation in {ms} (in km2)",
+            ylabel="Agricultural Land Occupation (km2)",
+            legend={"loc": "upper right"},
+            savefig_kwargs={"bbox_inches": "tight"}
+        )
 
         # A. Plot individual species
-        for spec in df_ms["Species"].unique():
-            df_spec = df_ms[df_ms["Species"] == spec].sort_values("Year")
-            if df_spec["Value"].sum() > 0:
-                ax.plot(
-                    df_spec["Year"], 
-                    df_spec["Value"], 
+        for spec in species_list:
+            values = ms_cube.sel(Species=spec).data
+            present = ~np.isnan(values)
+            if values[present].sum() > 0:
+                job.add_line(
+                    years[present], 
+                    values[present], 
                     label=spec,
                     color=SPECIES_COLORS.get(spec, "#333333")
                 )
 
         # B. Plot 'All Species' aggregate
-        ax.plot(
-            df_ms_agg["Year"], 
-            df_ms_agg["Value"], 
+        job.add_line(
+            years[ms_present], 
+            ms_total[ms_present], 
             label="All Species",
             color=SPECIES_COLORS["All Species"],
             linewidth=4,
             alpha=0.7
         )
-
-        ax.set_title(f"Projected Agricultural Land Occupation in {ms} (in km2)")
-        ax.set_ylabel("Agricultural Land Occupation (km2)")
-        ax.legend(loc="upper right")
-        
-        clean_ms = ms.replace(" ", "_")
-        plt.savefig(output_figures_dir / f"ID28_AgriculturalLandOccupation_{clean_ms}.png", bbox_inches='tight')
-        plt.close(fig)
+        jobs.append(job)
 
     # ---------------------------------------------------------
     # 2. EU Aggregate Plot
     # ---------------------------------------------------------
-    df_eu_species = df_proj.groupby(["Year", "Species"])["Value"].sum().reset_index()
-    df_eu_total = df_proj.groupby("Year")["Value"].sum().reset_index()
+    eu_species = cube.sum("Country")
+    eu_present = ~np.isnan(cube.data).all(axis=0)
+    eu_total = eu_species.sum("Species").data
     
-    if not df_eu_total.empty and df_eu_total[df_eu_total["Year"] > 2025]["Value"].sum() > 0:
-        fig, ax = plt.subplots()
+    if eu_total[after_2025].sum() > 0:
+        job = FigureJob(
+            "ID28_AgriculturalLandOccupation_EU_Total.png",
+            title="Projected Total Agricultural Land Occupation in EU",
+            ylabel="Agricultural Land Occupation (km2)",
+            legend={"loc": "upper right"},
+            savefig_kwargs={"bbox_inches": "tight"}
+        )
         
-        for spec in df_eu_species["Species"].unique():
-            df_spec = df_eu_species[df_eu_species["Species"] == spec].sort_values("Year")
-            if df_spec["Value"].sum() > 0:
-                ax.plot(
-                    df_spec["Year"], 
-                    df_spec["Value"], 
+        for spec, values, present in zip(eu_species.coords["Species"], eu_species.data, eu_present):
+            if values[present].sum() > 0:
+                job.add_line(
+                    years[present], 
+                    values[present], 
                     label=spec,
                     color=SPECIES_COLORS.get(spec, "#333333")
                 )
 
-        ax.plot(
-            df_eu_total["Year"], 
-            df_eu_total["Value"], 
+        job.add_line(
+            years, 
+            eu_total, 
             label="EU-27 Total (All Species)",
             color=SPECIES_COLORS["All Species"],
             linewidth=4,
             alpha=0.7
         )
-        
-        ax.set_title("Projected Total Agricultural Land Occupation in EU")
-        ax.set_ylabel("Agricultural Land Occupation (km2)")
-        ax.legend(loc="upper right")
-        
-        plt.savefig(output_figures_dir / "ID28_AgriculturalLandOccupation_EU_Total.png", bbox_inches='tight')
-        plt.close(fig)
\ No newline at end of file
+        jobs.append(job)
+
+    return jobs
@@ -42,6 +42,9 @@ Indicator: {indicator}
 Scenario: {scenario}
 """
 
+# Projections of other indicators read by this one (see scheduler.py)
+UPSTREAM = []
+
 def run_projection_{scenario}(df):
     """
     Generate projection data for indicator {indicator}
@@ -1,111 +1,223 @@
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
 import importlib
+import time
 
-from figure_theme import Theme
+import projection_registry
+from fingerprints import FINGERPRINT_COLUMNS, OUTPUT_FINGERPRINT, code_fingerprint, combine, frame_fingerprint
+from figure_jobs import FigureRenderer
+from run_metrics import LOG_METRIC_COLUMNS, RunMetrics, measure
+from scheduler import build_dependency_graph, get_upstream, run_graph, run_indicator_projection
+from sensitivity import run_sensitivity, write_bands
+from vocabulary import Vocabulary
+from workbook_io import InputStore, ProjectionWriter
+from zero_runs import RUN_LENGTH, compress_zero_runs
 
 # -----------------------------
 # Configuration
 # -----------------------------
+# Scenario of run_scenario_projections() when none is given
 scenario = "S1"
+# Scenarios of run_scenarios(): run concurrently, each in its own process and output folder
+scenarios = ["S1"]
+# Worker processes for scenarios (None: one per scenario)
+scenario_workers = None
+# True: rerun every indicator. False: rerun only indicators whose input sheet, upstream
+# projections or code changed since projection_log was written (and reuse the others)
 overwrite_previous_projection = True
+# Write projected_data.xlsx after every N indicators (None: once, at the end of the run)
+checkpoint_every = None
+# Worker processes for independent projections (None: one per CPU)
+max_workers = None
+# Worker processes for figure rendering (None: one per CPU, 1: render in this process)
+figure_workers = None
+# Keep a columnar (Feather) copy of the input sheets, so later runs skip the Excel parser
+input_cache = True
+# Skip figures whose data, theme and rendering code are unchanged (keys in figures/figure_manifest.json)
+figure_cache = True
+# Monte Carlo draws of the S1 parameters for percentile bands in sensitivity.xlsx (None: no sensitivity run)
+sensitivity_draws = None
+sensitivity_seed = 42
+# Trace the peak memory of every projection (run_metrics.json/csv and projection_log); slows projections down,
+# so it is off for normal runs (python -m benchmarks.bench_projections --trace-memory traces the projections alone)
+trace_memory = False
 
 # Paths
 data_folder = Path("data")
 input_file = data_folder / "input" / "input.xlsx"
-output_folder = data_folder / "output" / f"{scenario}_output"
-output_file = output_folder / "projected_data.xlsx"
-figures_folder = output_folder / "figures"
+input_cache_folder = data_folder / "cache" / "input"
+output_base_folder = data_folder / "output"
 
-theme = Theme()
-Theme.apply_global()
+# The global Theme is applied by the figure renderer, so projection-only runs never load matplotlib
 # -----------------------------
 # Functions
 # -----------------------------
+PROJECTION_LOG_COLUMNS = (
+    ["Indicator", "Scenario", "Generated", "Timestamp"] + FINGERPRINT_COLUMNS + [OUTPUT_FINGERPRINT]
+    + LOG_METRIC_COLUMNS
+)
+
+def scenario_output_root(scenario):
+    """Default output folder of a scenario (data/output/<scenario>_output)"""
+    return output_base_folder / f"{scenario}_output"
+
 def load_projection_log(output_file):
     """Load projection log from Excel or create empty if not exists"""
     if output_file.exists():
         xls = pd.ExcelFile(output_file)
         if "projection_log" in xls.sheet_names:
-            return xls.parse("projection_log")
-    return pd.DataFrame(columns=["Indicator", "Scenario", "Generated", "Timestamp"])
+            # Logs of earlier versions have no fingerprints: their projections are recomputed
+            return xls.parse("projection_log").reindex(columns=PROJECTION_LOG_COLUMNS)
+    return pd.DataFrame(columns=PROJECTION_LOG_COLUMNS)
 
-def load_input_for_indicator(indicator):
-    """Load input sheet for a single indicator"""
-    try:
-        return pd.read_excel(input_file, sheet_name=indicator)
-    except ValueError:
+def load_input_store(indicators):
+    """Open the input workbook once and parse the sheets needed by the indicators (or read their cached copy)"""
+    cache_dir = input_cache_folder if input_cache else None
+    return InputStore(input_file, cache_dir=cache_dir).load(indicators)
+
+def load_input_for_indicator(indicator, input_store):
+    """Load input sheet for a single indicator from the in-memory store"""
+    df = input_store.get(indicator)
+    if df is None:
         print(f"[WARNING] No input sheet for {indicator}, using empty DataFrame")
         return pd.DataFrame()
+    return df
+
+def prepare_histories(indicators, input_store):
+    """
+    Run the scenario-independent prepare_history() of the indicator modules
+    that define one, once for all scenarios
+    """
+    histories = {}
+    for indicator in indicators:
+        try:
+            mod = importlib.import_module(f"indicators.{indicator}")
+        except ModuleNotFoundError:
+            continue
+        if hasattr(mod, "prepare_history") and input_store.get(indicator) is not None:
+            histories[indicator] = mod.prepare_history(input_store.get(indicator))
+    return histories
+
+def completed_future(result):
+    """Wrap a result that is already available in a finished Future"""
+    fut = Future()
+    fut.set_result(result)
+    return fut
+
+def logged_entry(projection_log, indicator, scenario):
+    """The projection_log row of an indicator and scenario (None if not logged)"""
+    rows = projection_log[
+        (projection_log["Indicator"] == indicator) & 
+        (projection_log["Scenario"] == scenario)
+    ]
+    return None if rows.empty else rows.iloc[-1]
+
+def projection_fingerprints(indicator, input_df, output_fingerprints):
+    """
+    Fingerprints of what one indicator's projection depends on: its input
+    sheet, the results of its UPSTREAM indicators (output_fingerprints maps
+    each to the fingerprint of its result) and its code.
+    """
+    upstream = sorted(get_upstream(indicator))
+    return {
+        "Input Fingerprint": frame_fingerprint(input_df),
+        "Upstream Fingerprint": combine(*(f"{up}={output_fingerprints.get(up, '')}" for up in upstream)),
+        "Code Fingerprint": code_fingerprint(indicator),
+    }
+
+def is_up_to_date(entry, fingerprints):
+    """True if a logged projection was generated from the same input, upstream results and code"""
+    return entry is not None and all(entry.get(col) == fingerprints[col] for col in FINGERPRINT_COLUMNS)
+
+def submit_projection(pool, indicator, input_df, projection_log, upstream, scenario, output_file, history=None,
+                      fingerprints=None, metrics=None, vocabulary=None):
+    """
+    Schedule the projection function of one indicator and scenario on the process pool.
 
-def run_projection(indicator, input_df, projection_log):
-    """Run the projection function for one indicator"""
+    Returns (future, status) with status "generated", "reused" or "skipped".
+    Reused and skipped indicators resolve immediately in this process.
+    Without overwrite_previous_projection, a logged projection whose
+    fingerprints match is reused from the output workbook.
+    With metrics (a RunMetrics), the projection time and peak memory are
+    measured in the worker and recorded before the future resolves.
+    With a vocabulary, key columns of the result (generated or reused) are Categoricals.
+    Reused projections store their zero runs (ZERO_RUN_VALUES of the module) as generated ones do.
+    """
     try:
         mod = importlib.import_module(f"indicators.{indicator}")
     except ModuleNotFoundError:
         print(f"[WARNING] Module not found for {indicator}, skipping")
-        return pd.DataFrame(), projection_log
+        return completed_future(pd.DataFrame()), "skipped"
 
-    already_generated = (
-        not projection_log.empty
-        and ((projection_log["Indicator"] == indicator) & 
-             (projection_log["Scenario"] == scenario)).any()
-    )
-
-    df_proj = pd.DataFrame()
-    if already_generated and not overwrite_previous_projection:
-        print(f"[INFO] Skipping projection for {indicator}: already in log")
+    if not overwrite_previous_projection and is_up_to_date(logged_entry(projection_log, indicator, scenario), fingerprints):
         # Load existing projection
-        if output_file.exists():
-            try:
-                df_proj = pd.read_excel(output_file, sheet_name=indicator)
-            except ValueError:
-                df_proj = pd.DataFrame()
-    else:
-        run_func_name = f"run_projection_{scenario}"
-        if hasattr(mod, run_func_name):
-            df_proj = getattr(mod, run_func_name)(input_df)
-            print(f"[INFO] Projection completed for {indicator}")
-        else:
-            print(f"[INFO] No projection function for {indicator} ({scenario}), skipping")
-            return pd.DataFrame(), projection_log
-
-        # Update projection log
-        projection_log = projection_log[
-            ~((projection_log["Indicator"] == indicator) & 
-              (projection_log["Scenario"] == scenario))
-        ]
-        projection_log = pd.concat(
-            [
-                projection_log,
-                pd.DataFrame({
-                    "Indicator": [indicator],
-                    "Scenario": [scenario],
-                    "Generated": [True],
-                    "Timestamp": [datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
-                })
-            ],
-            ignore_index=True
-        )
+        df_proj = projection_registry.get_projection(indicator, output_file)
+        if df_proj is not None:
+            print(f"[INFO] Reusing projection for {indicator}: input, upstream and code unchanged")
+            if vocabulary is not None:
+                df_proj = vocabulary.apply(df_proj)
+            # The workbook holds dense rows; publish the zero runs as a generated run does
+            if hasattr(mod, "ZERO_RUN_VALUES"):
+                df_proj = compress_zero_runs(df_proj, mod.ZERO_RUN_VALUES)
+            return completed_future(df_proj), "reused"
+
+    run_func_name = f"run_projection_{scenario}"
+    if not hasattr(mod, run_func_name):
+        print(f"[INFO] No projection function for {indicator} ({scenario}), skipping")
+        return completed_future(pd.DataFrame()), "skipped"
+
+    args = (indicator, scenario, input_df, upstream, output_file, history, vocabulary)
+    if metrics is None:
+        return pool.submit(run_indicator_projection, *args), "generated"
+    fut = pool.submit(measure, run_indicator_projection, *args, trace_memory=trace_memory)
+    return metrics.watch(indicator, fut), "generated"
 
-    return df_proj, projection_log
+def update_projection_log(indicator, projection_log, scenario, fingerprints=None):
+    """
+    Record a newly generated projection in the projection log, with its
+    fingerprints and stage metrics (extra columns given as a dict)
+    """
+    projection_log = projection_log[
+        ~((projection_log["Indicator"] == indicator) & 
+          (projection_log["Scenario"] == scenario))
+    ].reset_index(drop=True)
+    entry = {
+        "Indicator": indicator,
+        "Scenario": scenario,
+        "Generated": True,
+        "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    entry.update(fingerprints or {})
+    row = pd.DataFrame([[entry.get(col) for col in projection_log.columns]], columns=projection_log.columns)
+    if projection_log.empty:
+        return row
+    # Unset values (e.g. metrics not measured) take the log's dtype (float for
+    # integer columns), as a concat with all-NA columns is deprecated in pandas 2 and warns
+    row = row.astype({
+        col: projection_log[col].dtype if projection_log[col].dtype.kind in "fO" else float
+        for col in row.columns
+        if row[col].isna().all() and projection_log[col].dtype.kind in "fOiu"
+    })
+    return pd.concat([projection_log, row], ignore_index=True)
 
-def save_projection_and_log(indicator, df_proj, projection_log):
-    """Save one indicator's projection and updated log to Excel"""
+def save_projection_and_log(indicator, df_proj, projection_log, writer):
+    """Buffer one indicator's projection and updated log for the output workbook"""
     if isinstance(df_proj, tuple):
         # unpack if accidentally returned as tuple
         df_proj = df_proj[0]
 
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    with pd.ExcelWriter(output_file, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-        df_proj.to_excel(writer, sheet_name=indicator, index=False)
-        projection_log.to_excel(writer, sheet_name="projection_log", index=False)
+    writer.set_log(projection_log)
+    writer.add(indicator, df_proj)
 
 
-
-def generate_figures(indicator, df_proj, projection_log):
-    """Generate figures for one indicator if projection exists in log"""
+def generate_figures(indicator, df_proj, projection_log, renderer, scenario, metrics=None):
+    """
+    Build the figure jobs of one indicator and hand them to the renderer if
+    projection exists in log (the build time is added to metrics, if given)
+    """
     try:
         mod = importlib.import_module(f"indicators.{indicator}")
     except ModuleNotFoundError:
@@ -117,8 +229,34 @@ def generate_figures(indicator, df_proj, projection_log):
 
         fig_func_name = f"make_figures_{scenario}"
         if hasattr(mod, fig_func_name):
-            getattr(mod, fig_func_name)(df_proj)
-            print(f"[INFO] Figures generated for {indicator}")
+            start = time.perf_counter()
+            jobs = getattr(mod, fig_func_name)(df_proj)
+            # Modules without figure jobs draw their figures themselves and return None
+            renderer.submit(indicator, jobs or [])
+            if metrics is not None:
+                metrics.add(indicator, "Figures (s)", time.perf_counter() - start)
+
+def make_figure_renderer(figures_folder, do_figures=True):
+    """
+    Figure renderer writing to one scenario's figures folder (with its figure
+    cache if enabled); an empty context if no figures are requested.
+    """
+    if not do_figures:
+        return nullcontext()
+    return FigureRenderer(figures_folder, max_workers=figure_workers, cache=figure_cache)
+
+def write_run_metrics(metrics, output_root, writer, renderer):
+    """
+    Add the save and figure rendering times of the finished run to metrics
+    and write run_metrics.json/csv next to projected_data.xlsx
+    """
+    for indicator, seconds in writer.write_times.items():
+        metrics.record(indicator, **{"Save (s)": seconds})
+    if renderer is not None:
+        for indicator, seconds in renderer.render_times.items():
+            metrics.add(indicator, "Figures (s)", seconds)
+    path = metrics.write(output_root, **{"Workbook Write (s)": writer.flush_time, "Trace Memory": trace_memory})
+    print(f"[INFO] Run metrics: {path}")
 
 # -----------------------------
 # Workflow function
@@ -126,44 +264,207 @@ def generate_figures(indicator, df_proj, projection_log):
 def run_scenario_projections(
     indicators,
     do_projection=True,
-    do_figures=True
+    do_figures=True,
+    scenario=scenario,
+    output_root=None,
+    input_store=None,
+    histories=None
 ):
-    """Run projections and/or figures for a list of indicators"""
+    """
+    Run projections and/or figures for a list of indicators and one scenario.
+
+    Projections run in dependency order (see the UPSTREAM list of each
+    indicator module); independent indicators run in parallel.
+    Results are written below output_root (default: scenario_output_root).
+    input_store and histories are loaded here unless passed in, e.g. by
+    run_scenarios() which shares them between scenarios.
+    """
+    output_root = Path(output_root) if output_root is not None else scenario_output_root(scenario)
+    output_file = output_root / "projected_data.xlsx"
+    figures_folder = output_root / "figures"
+
     projection_log = load_projection_log(output_file)
+    writer = ProjectionWriter(output_file, checkpoint_every=checkpoint_every, sheet_order=indicators)
+    metrics = RunMetrics(scenario)
+    projection_registry.clear(output_file)
 
-    for indicator in indicators:
-        # 1. Load input
-        input_df = load_input_for_indicator(indicator)
-
-        df_proj = pd.DataFrame()
-        if do_projection:
-            # 2. Run projection
-            df_proj, projection_log = run_projection(indicator, input_df, projection_log)
-            # 3. Save projection and log immediately
-            save_projection_and_log(indicator, df_proj, projection_log)
-        else:
-            # Load existing projection for figures
-            if output_file.exists():
-                try:
-                    df_proj = pd.read_excel(output_file, sheet_name=indicator)
-                except ValueError:
+    if not do_projection:
+        with make_figure_renderer(figures_folder, do_figures) as renderer:
+            for indicator in indicators:
+                # Load existing projection for figures
+                df_proj = projection_registry.get_projection(indicator, output_file)
+                if df_proj is None:
                     df_proj = pd.DataFrame()
+                # Known key values as Categoricals (no input workbook is read here)
+                df_proj = Vocabulary().apply(df_proj)
+                if do_figures:
+                    generate_figures(indicator, df_proj, projection_log, renderer, scenario, metrics)
+        write_run_metrics(metrics, output_root, writer, renderer)
+        print(f"[INFO] Finished {scenario} workflow\nData: {output_file}\nFigures: {figures_folder}/")
+        return
+
+    # 1. Load inputs and order the indicators by their dependencies
+    if input_store is None:
+        input_store = load_input_store(indicators)
+    if histories is None:
+        histories = prepare_histories(indicators, input_store)
+    graph = build_dependency_graph(indicators)
+    generated = set()
+    reused = set()
+    fingerprints = {}
+    # Result fingerprint of every projection; indicators outside this run keep their logged one
+    output_fingerprints = {
+        entry["Indicator"]: entry[OUTPUT_FINGERPRINT]
+        for _, entry in projection_log[projection_log["Scenario"] == scenario].iterrows()
+    }
+
+    def submit(pool, indicator, upstream):
+        input_df = load_input_for_indicator(indicator, input_store)
+        for up, df_up in upstream.items():
+            if up in generated:
+                output_fingerprints[up] = frame_fingerprint(df_up)
+        fingerprints[indicator] = projection_fingerprints(indicator, input_df, output_fingerprints)
+        # 2. Run projection (in a worker process), unless an up-to-date one is reused
+        fut, status = submit_projection(
+            pool, indicator, input_df, projection_log, upstream,
+            scenario, output_file, history=histories.get(indicator),
+            fingerprints=fingerprints[indicator], metrics=metrics, vocabulary=input_store.vocabulary
+        )
+        metrics.record(indicator, **{
+            "Status": status,
+            "Input Load (s)": input_store.parse_times.get(indicator),
+            "Rows In": len(input_df),
+        })
+        if status == "generated":
+            generated.add(indicator)
+        elif status == "reused":
+            reused.add(indicator)
+        return fut
+
+    def on_done(indicator, df_proj):
+        nonlocal projection_log
+        if isinstance(df_proj, tuple):
+            # unpack if accidentally returned as tuple
+            df_proj = df_proj[0]
+        # Rows the projection stands for (as written to the workbook), also for zero runs
+        rows_out = int(df_proj[RUN_LENGTH].sum()) if RUN_LENGTH in df_proj.columns else len(df_proj)
+        metrics.record(indicator, **{"Rows Out": rows_out})
+        if indicator in generated:
+            print(f"[INFO] Projection completed for {indicator}")
+            output_fingerprints[indicator] = frame_fingerprint(df_proj)
+            measured = metrics.get(indicator)
+            projection_log = update_projection_log(
+                indicator, projection_log, scenario,
+                {
+                    **fingerprints[indicator],
+                    OUTPUT_FINGERPRINT: output_fingerprints[indicator],
+                    **{col: measured.get(col) for col in LOG_METRIC_COLUMNS},
+                }
+            )
+
+        # Make the result available to downstream indicators
+        projection_registry.publish(indicator, df_proj)
+        # 3. Buffer projection and log (written at the end of the run); reused
+        #    projections are already in the workbook
+        if indicator not in reused:
+            save_projection_and_log(indicator, df_proj, projection_log, writer)
 
         if do_figures:
-            # 4. Generate figures
-            generate_figures(indicator, df_proj, projection_log)
+            # 4. Generate figures (rendered on the figure pool while projections continue)
+            generate_figures(indicator, df_proj, projection_log, renderer, scenario, metrics)
+
+    with make_figure_renderer(figures_folder, do_figures) as renderer:
+        try:
+            run_graph(graph, submit, on_done, max_workers=max_workers)
+        finally:
+            # Write whatever finished, even if a later indicator failed
+            writer.flush()
+    # 5. Stage times, row counts and peak memory of every indicator
+    write_run_metrics(metrics, output_root, writer, renderer)
 
     print(f"[INFO] Finished {scenario} workflow\nData: {output_file}\nFigures: {figures_folder}/")
 
+def run_scenarios(
+    scenarios,
+    indicators,
+    do_projection=True,
+    do_figures=True,
+    output_roots=None
+):
+    """
+    Run several scenarios concurrently, each in its own worker process.
+
+    The input workbook is parsed, and the scenario-independent history of the
+    indicators prepared, once; every scenario then receives them together
+    with its own output folder (output_roots[scenario], default:
+    scenario_output_root). A failing scenario does not stop the others;
+    the first failure is raised once all scenarios are done.
+    """
+    output_roots = {
+        sc: Path(output_roots[sc]) if output_roots and sc in output_roots else scenario_output_root(sc)
+        for sc in scenarios
+    }
+    if len(set(output_roots.values())) < len(output_roots):
+        raise ValueError("Each scenario needs its own output folder")
+
+    input_store, histories = None, None
+    if do_projection:
+        input_store = load_input_store(indicators)
+        histories = prepare_histories(indicators, input_store)
+
+    if len(scenarios) == 1:
+        run_scenario_projections(
+            indicators, do_projection, do_figures,
+            scenarios[0], output_roots[scenarios[0]], input_store, histories
+        )
+        return
+
+    failures = {}
+    with ProcessPoolExecutor(max_workers=scenario_workers or len(scenarios)) as pool:
+        futures = {
+            sc: pool.submit(
+                run_scenario_projections, indicators, do_projection, do_figures,
+                sc, output_roots[sc], input_store, histories
+            )
+            for sc in scenarios
+        }
+        for sc, fut in futures.items():
+            try:
+                fut.result()
+            except Exception as exc:
+                print(f"[WARNING] Scenario {sc} failed: {exc!r}")
+                failures[sc] = exc
+
+    if failures:
+        raise next(iter(failures.values()))
+    print(f"[INFO] Finished scenarios: {', '.join(scenarios)}")
+
+def run_sensitivity_analysis(indicators, n_draws, output_root=None, input_store=None):
+    """
+    Percentile bands of the S1 indicators over n_draws sampled parameter sets
+    (see sensitivity.py), written to sensitivity.xlsx in output_root
+    (default: the S1 output folder).
+    """
+    output_root = Path(output_root) if output_root is not None else scenario_output_root("S1")
+    if input_store is None:
+        input_store = load_input_store(indicators)
+    bands = run_sensitivity(input_store, n_draws, indicators, seed=sensitivity_seed)
+    output_file = output_root / "sensitivity.xlsx"
+    write_bands(bands, output_file)
+    print(f"[INFO] Finished sensitivity analysis ({n_draws} draws)\nData: {output_file}")
+
 # -----------------------------
 # Run example
 # -----------------------------
 if __name__ == "__main__":
-    # Process only "Amount_Of_Pelts_Produced_Per_MS"
+    # Execution order follows the UPSTREAM declarations of the indicator modules
     indicators_of_interest = [
         "Amount_Of_Pelts_Produced_Per_MS", "Amount_Fur_Companies_Per_MS", "ID28", "ID19", "ID25", "ID26", "ID27"
     ]
     
     # Set to True to perform both projection and figures generation
-    run_scenario_projections(indicators_of_interest, do_projection=True, do_figures=True)
+    run_scenarios(scenarios, indicators_of_interest, do_projection=True, do_figures=True)
+
+    if sensitivity_draws:
+        run_sensitivity_analysis(indicators_of_interest, sensitivity_draws)
 
@@ -0,0 +1,54 @@
+"""
+In-process registry of finished projections.
+
+main.run_scenario_projections publishes each indicator's projection here as
+soon as it is available, so downstream indicators (e.g. ID19, ID25-28 and
+Amount_Fur_Companies_Per_MS) take their driver DataFrame from memory instead
+of reading projected_data.xlsx back from disk.
+
+The registry serves one scenario at a time: clear(output_file) resets it and
+sets the scenario's workbook, which get_projection() falls back to.
+"""
+
+import pandas as pd
+
+_RESULTS = {}
+_OUTPUT_FILE = None
+
+
+def publish(indicator, df):
+    """Register the projection of one indicator"""
+    _RESULTS[indicator] = df
+
+
+def clear(output_file=None):
+    """
+    Forget all registered projections and set the workbook of the active
+    scenario (projected_data.xlsx of its output folder; None: no fallback).
+    """
+    global _OUTPUT_FILE
+    _RESULTS.clear()
+    _OUTPUT_FILE = output_file
+
+
+def get_projection(indicator, output_file=None):
+    """
+    Return a copy of an indicator's projection.
+
+    Falls back to the sheet in output_file (default: the workbook set by
+    clear()) when the indicator did not run in this process (resumed runs);
+    the sheet is then registered for later readers. Returns None if the
+    projection is not available anywhere.
+    """
+    if indicator not in _RESULTS:
+        output_file = output_file if output_file is not None else _OUTPUT_FILE
+        if output_file is None or not output_file.exists():
+            return None
+        try:
+            df = pd.read_excel(output_file, sheet_name=indicator)
+        except ValueError:
+            return None
+        print(f"[INFO] Loaded {indicator} projection from {output_file}")
+        publish(indicator, df)
+
+    return _RESULTS[indicator].copy()
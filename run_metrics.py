@@ -0,0 +1,126 @@
+"""
+Per-stage metrics of a projection run.
+
+RunMetrics collects, for every indicator of one scenario run, the time of
+each pipeline stage (input load, projection, save, figures), the rows read
+and written and, if traced, the peak memory of the projection, and writes them to
+run_metrics.json and run_metrics.csv next to the output workbook. The
+projection-stage values are also recorded in projection_log.
+
+Projections run in worker processes: measure() wraps the projection
+function there, timing it and, with trace_memory, tracing its peak Python
+memory (tracemalloc, which also sees NumPy buffers but slows the projection
+down, so it is off unless asked for), and RunMetrics.watch() unpacks the
+result in the main process.
+"""
+
+import json
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Future
+from datetime import datetime
+
+import pandas as pd
+
+from workbook_io import atomic_write_text
+
+METRICS_JSON = "run_metrics.json"
+METRICS_CSV = "run_metrics.csv"
+
+METRIC_COLUMNS = [
+    "Status", "Input Load (s)", "Projection (s)", "Save (s)", "Figures (s)",
+    "Rows In", "Rows Out", "Peak Memory (MB)"
+]
+# Known when a projection completes, so also recorded in projection_log
+LOG_METRIC_COLUMNS = ["Input Load (s)", "Projection (s)", "Rows In", "Rows Out", "Peak Memory (MB)"]
+
+
+def measure(func, *args, trace_memory=False):
+    """
+    Run func(*args), returning (result, metrics) with its wall time and,
+    with trace_memory, the peak memory allocated while it ran.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = func(*args)
+        metrics = {"Projection (s)": time.perf_counter() - start}
+        if trace_memory:
+            metrics["Peak Memory (MB)"] = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return result, metrics
+
+
+class RunMetrics:
+    """Stage metrics of every indicator of one scenario run"""
+
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.indicators = {}
+        self.run = {}
+        self._lock = threading.Lock()
+
+    def record(self, indicator, **values):
+        """Set metrics of one indicator (keys as in METRIC_COLUMNS)"""
+        with self._lock:
+            self.indicators.setdefault(indicator, {}).update(values)
+
+    def add(self, indicator, column, value):
+        """Add to a metric of one indicator (e.g. a stage that runs in several steps)"""
+        with self._lock:
+            entry = self.indicators.setdefault(indicator, {})
+            entry[column] = entry.get(column, 0) + value
+
+    def get(self, indicator):
+        """Metrics of one indicator recorded so far"""
+        with self._lock:
+            return dict(self.indicators.get(indicator, {}))
+
+    def watch(self, indicator, future):
+        """
+        Future of the projection alone, for a future of measure(); the
+        measured values are recorded before it resolves.
+        """
+        result = Future()
+
+        def unpack(fut):
+            try:
+                df_proj, values = fut.result()
+            except BaseException as exc:
+                result.set_exception(exc)
+                return
+            self.record(indicator, **values)
+            result.set_result(df_proj)
+
+        future.add_done_callback(unpack)
+        return result
+
+    def frame(self):
+        """One row per indicator with every metric column"""
+        rows = [{"Indicator": ind, "Scenario": self.scenario, **values} for ind, values in self.indicators.items()]
+        return pd.DataFrame(rows).reindex(columns=["Indicator", "Scenario"] + METRIC_COLUMNS)
+
+    def write(self, output_root, **run_values):
+        """Write run_metrics.json (run totals and indicators) and run_metrics.csv (indicators)"""
+        self.run.update(run_values)
+        self.run.update({
+            "Scenario": self.scenario,
+            "Started": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "Total (s)": time.perf_counter() - self._start,
+        })
+        df = self.frame()
+        output_root.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(output_root / METRICS_CSV, df.to_csv(index=False))
+        # NaN (stage not run) is written as null
+        indicators = json.loads(df.to_json(orient="records"))
+        atomic_write_text(
+            output_root / METRICS_JSON,
+            json.dumps({"run": self.run, "indicators": indicators}, indent=2)
+        )
+        return output_root / METRICS_JSON
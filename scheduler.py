@@ -0,0 +1,117 @@
+"""
+Dependency-graph scheduler for indicator projections.
+
+Each indicator module declares the projections it reads in a module-level
+UPSTREAM list (e.g. UPSTREAM = ["Amount_Of_Pelts_Produced_Per_MS"]).
+build_dependency_graph() turns the requested indicators into a DAG,
+topological_order() checks that it is acyclic, and run_graph() runs every
+indicator on a process pool as soon as its upstream projections are done.
+"""
+
+import importlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+import projection_registry
+
+
+def get_upstream(indicator):
+    """Return the UPSTREAM declaration of an indicator module (empty if none)"""
+    try:
+        mod = importlib.import_module(f"indicators.{indicator}")
+    except ModuleNotFoundError:
+        return []
+    return list(getattr(mod, "UPSTREAM", []))
+
+
+def build_dependency_graph(indicators):
+    """
+    Map each requested indicator to the requested indicators it depends on.
+    Upstream projections that are not requested are read from a previous run.
+    """
+    requested = set(indicators)
+    return {
+        indicator: [up for up in get_upstream(indicator) if up in requested]
+        for indicator in indicators
+    }
+
+
+def topological_order(graph):
+    """
+    Return the indicators of the graph in dependency order, keeping the
+    requested order among independent indicators.
+    Raises ValueError if the dependencies contain a cycle.
+    """
+    order = []
+    done = set()
+    remaining = list(graph)
+
+    while remaining:
+        ready = [ind for ind in remaining if all(up in done for up in graph[ind])]
+        if not ready:
+            raise ValueError(f"Dependency cycle between indicators: {', '.join(remaining)}")
+        order.extend(ready)
+        done.update(ready)
+        remaining = [ind for ind in remaining if ind not in done]
+
+    return order
+
+
+def run_indicator_projection(indicator, scenario, input_df, upstream, output_file, history=None, vocabulary=None):
+    """
+    Worker entry point: run one indicator's projection function with the
+    results of its upstream indicators registered in the worker process.
+    output_file is the scenario's workbook (fallback for other projections);
+    history is the indicator's shared prepare_history() result, if any.
+    With a vocabulary (vocabulary.Vocabulary), the key columns of the result
+    are returned as its Categoricals.
+    """
+    projection_registry.clear(output_file)
+    for name, df in upstream.items():
+        projection_registry.publish(name, df)
+
+    mod = importlib.import_module(f"indicators.{indicator}")
+    run_func = getattr(mod, f"run_projection_{scenario}")
+    if history is None:
+        df_proj = run_func(input_df)
+    else:
+        df_proj = run_func(input_df, history=history)
+    if vocabulary is not None and isinstance(df_proj, pd.DataFrame):
+        df_proj = vocabulary.apply(df_proj)
+    return df_proj
+
+
+def run_graph(graph, submit, on_done, max_workers=None):
+    """
+    Run every indicator of the graph once all its upstream indicators are done.
+
+    submit(pool, indicator, upstream) must return a Future for the indicator's
+    result, where upstream maps each upstream indicator to its result.
+    on_done(indicator, result) is called in this process and in topological
+    order, so logs and output sheets do not depend on completion order.
+    """
+    order = topological_order(graph)
+    futures = {}
+    results = {}
+    next_done = 0
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while next_done < len(order):
+            # Start every indicator whose upstream results are all available
+            for indicator in order:
+                if indicator not in futures and all(up in results for up in graph[indicator]):
+                    upstream = {up: results[up] for up in graph[indicator]}
+                    futures[indicator] = submit(pool, indicator, upstream)
+
+            running = [fut for ind, fut in futures.items() if ind not in results]
+            wait(running, return_when=FIRST_COMPLETED)
+            for indicator, fut in futures.items():
+                if indicator not in results and fut.done():
+                    results[indicator] = fut.result()
+
+            while next_done < len(order) and order[next_done] in results:
+                on_done(order[next_done], results[order[next_done]])
+                next_done += 1
+
+    return results
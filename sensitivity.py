@@ -0,0 +1,375 @@
+"""
+Monte Carlo sensitivity of the S1 projections to their hand-set parameters.
+
+sample_parameters() draws N sets of the uncertain parameters (ranges in
+PARAMETER_RANGES): the CAGR clamp of the market-driven pelts projection, the
+timing of the legal phase-outs, the ID19 operating costs per pelt and the
+ID19 2028 targets.
+
+SensitivityModel prepares the parameter-independent part of every indicator
+once (cleaned history, Theil-Sen slopes, baselines) and evaluates a batch of
+draws with the array functions of the indicator modules, which accept
+parameters with a leading draw dimension. Every output series is thus a
+[draw × series × year] array: N draws cost a few array operations instead
+of N pipeline runs. run_sensitivity() evaluates the draws in chunks and
+reduces every output series to percentile bands.
+"""
+
+import importlib
+
+import numpy as np
+import pandas as pd
+
+from impact_scaling import impact_baseline
+from indicators import Amount_Fur_Companies_Per_MS as companies
+from indicators import Amount_Of_Pelts_Produced_Per_MS as pelts
+from indicators import ID19, ID28
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+PELTS_SHEET = "Amount_Of_Pelts_Produced_Per_MS"
+FARMS_SHEET = "Amount_Fur_Companies_Per_MS"
+IMPACT_INDICATORS = ["ID25", "ID26", "ID27"]
+
+# Indicators with a batched evaluation, in dependency order
+SENSITIVITY_INDICATORS = [PELTS_SHEET, FARMS_SHEET, "ID28", "ID19"] + IMPACT_INDICATORS
+
+YEARS = np.arange(2010, 2041)
+
+# Sampling ranges (uniform; year shifts are integers, bounds included)
+PARAMETER_RANGES = {
+    # Lower CAGR clamp of the market-driven pelts trend (S1: MIN_ANNUAL_RATE = -0.2)
+    "min_annual_rate": (-0.30, -0.10),
+    # Upper CAGR cap of the market-driven pelts trend (S1: MAX_ANNUAL_RATE = 0.0)
+    "max_annual_rate": (-0.02, 0.02),
+    # Years added to "start" and "end" of the phase-out rules, drawn per country
+    "phase_out_delay": (-1, 2),
+    # Multiplier of the ID19 OPERATING_COSTS, drawn per species
+    "operating_cost_factor": (0.8, 1.2),
+    # Multiplier of the ID19 2028 targets, drawn per sector and indicator
+    "target_2028_factor": (0.9, 1.1),
+}
+
+# Countries with a legal phase-out, in rule order
+PHASE_OUT_COUNTRIES = list(dict.fromkeys(rule["country"] for rule in pelts.PHASE_OUT_RULES))
+
+PERCENTILES = (5, 50, 95)
+
+# Draws evaluated at once (bounds the size of the intermediate arrays)
+CHUNK_SIZE = 500
+
+
+# ---------------------------------------------------------
+# PARAMETERS
+# ---------------------------------------------------------
+def sample_parameters(n_draws, seed=None, ranges=PARAMETER_RANGES):
+    """
+    Draw n_draws parameter sets.
+
+    Returns:
+        dict: One array per parameter with the draws on the leading axis:
+            min_annual_rate, max_annual_rate [draw], phase_out_delay
+            [draw × PHASE_OUT_COUNTRIES], operating_cost_factor
+            [draw × ID19.FARMING_SPECIES], target_2028_factor
+            [draw × ID19.TARGET_SECTORS × ID19.INDICATOR_NAMES].
+    """
+    rng = np.random.default_rng(seed)
+    return {
+        "min_annual_rate": rng.uniform(*ranges["min_annual_rate"], n_draws),
+        "max_annual_rate": rng.uniform(*ranges["max_annual_rate"], n_draws),
+        "phase_out_delay": rng.integers(
+            *ranges["phase_out_delay"], (n_draws, len(PHASE_OUT_COUNTRIES)), endpoint=True
+        ),
+        "operating_cost_factor": rng.uniform(
+            *ranges["operating_cost_factor"], (n_draws, len(ID19.FARMING_SPECIES))
+        ),
+        "target_2028_factor": rng.uniform(
+            *ranges["target_2028_factor"], (n_draws, len(ID19.TARGET_SECTORS), len(ID19.INDICATOR_NAMES))
+        ),
+    }
+
+
+def central_parameters(n_draws=1):
+    """n_draws copies of the S1 parameters (reproduces the deterministic projections)"""
+    return {
+        "min_annual_rate": np.full(n_draws, pelts.MIN_ANNUAL_RATE),
+        "max_annual_rate": np.full(n_draws, pelts.MAX_ANNUAL_RATE),
+        "phase_out_delay": np.zeros((n_draws, len(PHASE_OUT_COUNTRIES)), dtype=int),
+        "operating_cost_factor": np.ones((n_draws, len(ID19.FARMING_SPECIES))),
+        "target_2028_factor": np.ones((n_draws, len(ID19.TARGET_SECTORS), len(ID19.INDICATOR_NAMES))),
+    }
+
+
+def take_draws(params, draws):
+    """Subset (slice or index array) of the draws of a parameter dict"""
+    return {name: values[draws] for name, values in params.items()}
+
+
+def delayed_rules(phase_out_delay, rules=pelts.PHASE_OUT_RULES):
+    """Phase-out rules with per-draw "start" / "end" arrays shifted by the country's delay"""
+    return [
+        {
+            **rule,
+            "start": rule["start"] + phase_out_delay[:, PHASE_OUT_COUNTRIES.index(rule["country"])],
+            "end": rule["end"] + phase_out_delay[:, PHASE_OUT_COUNTRIES.index(rule["country"])],
+        }
+        for rule in rules
+    ]
+
+
+# ---------------------------------------------------------
+# BATCHED MODEL
+# ---------------------------------------------------------
+class SensitivityModel:
+    """
+    Batched S1 projection of the indicators whose input sheets are available.
+
+    input_store is anything with a get(sheet) method returning the input
+    DataFrame or None (workbook_io.InputStore, or a dict of DataFrames).
+    series[indicator] describes the output series of an indicator (one row
+    per series: the key columns of its projection sheet and the projected
+    "Variable"); evaluate() returns the matching [draw × series × year] arrays.
+    """
+
+    def __init__(self, input_store, indicators=SENSITIVITY_INDICATORS):
+        self.series = {}
+        self._prepare_pelts(input_store.get(PELTS_SHEET))
+        if self.history is None:
+            print(f"[WARNING] No {PELTS_SHEET} data, sensitivity analysis skipped")
+            return
+
+        self.series[PELTS_SHEET] = pd.DataFrame({
+            "Country": self.row_countries, "Species": self.row_species, "Variable": "Pelts"
+        })
+        if FARMS_SHEET in indicators and input_store.get(FARMS_SHEET) is not None:
+            self._prepare_farms(input_store.get(FARMS_SHEET))
+            if "ID28" in indicators and input_store.get("ID28") is not None:
+                self._prepare_land(input_store.get("ID28"))
+        if "ID19" in indicators and input_store.get("ID19") is not None:
+            self._prepare_economics(input_store.get("ID19"))
+        self.impacts = {}
+        for indicator in IMPACT_INDICATORS:
+            if indicator in indicators and input_store.get(indicator) is not None:
+                self._prepare_impacts(indicator, input_store.get(indicator))
+
+    # --- Amount_Of_Pelts_Produced_Per_MS ---
+    def _prepare_pelts(self, df):
+        self.history = pelts.prepare_history(df) if df is not None else None
+        if self.history is None:
+            return
+        countries = self.history.index.get_level_values('Country').to_numpy()
+        species = self.history.index.get_level_values('Species').to_numpy()
+        self.slopes = pelts.fit_log_trends(self.history)
+        self.country_starts = np.flatnonzero(np.r_[True, countries[1:] != countries[:-1]])
+        self.n_groups = len(self.history)
+        # Rows as in run_projection_S1: species groups, then the "All Species" aggregate per country
+        self.row_countries = np.concatenate([countries, countries[self.country_starts]])
+        self.row_species = np.concatenate(
+            [species, np.full(len(self.country_starts), 'All Species', dtype=object)]
+        )
+
+    def _project_pelts(self, params):
+        n_draws, n_hist = len(params["min_annual_rate"]), len(pelts.HISTORICAL_YEARS)
+        block = np.empty((n_draws, len(self.row_countries), len(YEARS)))
+        block[:, :self.n_groups, :n_hist] = self.history.to_numpy(dtype=float)
+        pelts.project_groups(
+            self.history, pelts.PROJECTION_YEARS, out=block[:, :self.n_groups, n_hist:],
+            min_rate=params["min_annual_rate"], max_rate=params["max_annual_rate"],
+            rules=delayed_rules(params["phase_out_delay"]), slopes=self.slopes
+        )
+        np.add.reduceat(block[:, :self.n_groups], self.country_starts, axis=1, out=block[:, self.n_groups:])
+        return block
+
+    # --- Amount_Fur_Companies_Per_MS ---
+    def _prepare_farms(self, df):
+        df_farms_2025 = companies.farm_baseline(df)
+        self.farms_2025 = df_farms_2025["Number of Farms"].to_numpy(dtype=float)
+        # Pelts row of every baseline row (the appended zero row where there is none)
+        row_of = {key: i for i, key in enumerate(zip(self.row_countries, self.row_species))}
+        self.farm_rows = np.array([
+            row_of.get(key, len(self.row_countries))
+            for key in zip(df_farms_2025["Country"], df_farms_2025["Species"])
+        ], dtype=int)
+        self.series[FARMS_SHEET] = pd.DataFrame({
+            "Country": df_farms_2025["Country"].to_numpy(),
+            "Fur Industry Sector": companies.TARGET_SECTOR,
+            "Species": df_farms_2025["Species"].to_numpy(),
+            "Variable": "Number of Farms",
+        })
+
+    def _project_farms(self, block):
+        padded = np.concatenate([block, np.zeros(block.shape[:1] + (1,) + block.shape[2:])], axis=1)
+        baseline_col = np.flatnonzero(YEARS == companies.BASELINE_YEAR)[0]
+        return companies.project_farms(self.farms_2025, padded[:, self.farm_rows], baseline_col)
+
+    # --- ID28 ---
+    def _prepare_land(self, df):
+        self.land_2024 = ID28.agricultural_land_2024(df)
+        farms = self.series[FARMS_SHEET]
+        self.land_rows = np.flatnonzero(farms["Country"].to_numpy() != "European Union")
+        self.series["ID28"] = pd.DataFrame({
+            "Country": farms["Country"].to_numpy()[self.land_rows],
+            "Environmental Metric": "Agricultural land occupation",
+            "Species": farms["Species"].to_numpy()[self.land_rows],
+            "Fur Industry Sector": "Farming",
+            "Metric Unit": "km2",
+            "Variable": "Value",
+        })
+
+    def _project_land(self, farms):
+        total_farms_2024 = farms[:, :, YEARS == 2024].sum(axis=(1, 2))
+        has_farms = total_farms_2024 > 0
+        land_per_farm = np.where(has_farms, self.land_2024 / np.where(has_farms, total_farms_2024, 1), 0.0)
+        return farms[:, self.land_rows] * land_per_farm[:, np.newaxis, np.newaxis]
+
+    # --- ID19 ---
+    def _prepare_economics(self, df):
+        self.sectors, self.val_2024, self.val_2028 = ID19.sector_baseline(df)
+        if not self.sectors:
+            return
+        self.sector_rows = [ID19.TARGET_SECTORS.index(sector) for sector in self.sectors]
+        self.operating_costs = np.array([ID19.OPERATING_COSTS.get(sp, 0) for sp in ID19.FARMING_SPECIES], dtype=float)
+
+        # [species × pelts row] selection of FARMING_SPECIES (lowercase names if the exact one is absent)
+        row_species = pd.Series(self.row_species)
+        self.species_selection = np.array([
+            (row_species == sp).to_numpy() if (row_species == sp).any() else (row_species == sp.lower()).to_numpy()
+            for sp in ID19.FARMING_SPECIES
+        ], dtype=float)
+
+        ratio = "Ratio of FTE employment to sector turnover (€ million)"
+        keys = []
+        for sector in self.sectors:
+            keys += [("All Species", sector, name) for name in ID19.INDICATOR_NAMES]
+        keys += [("All Species", sector, ratio) for sector in self.sectors]
+        if "Farming" in self.sectors:
+            keys += [(sp, "Farming", name) for sp in ID19.FARMING_SPECIES for name in ID19.INDICATOR_NAMES]
+            keys += [(sp, "Farming", ratio) for sp in ID19.FARMING_SPECIES]
+            keys += [(sp, "Farming", "Operating Costs (in million €)") for sp in ID19.FARMING_SPECIES]
+        self.series["ID19"] = pd.DataFrame(keys, columns=["Species", "Fur Industry Sector", "Variable"])
+        self.series["ID19"].insert(0, "Country", "European Union")
+
+    def _project_economics(self, block, params):
+        n_draws = len(block)
+        # ID19 sums every pelts row per year (species and "All Species" rows alike)
+        total_pelts = block.sum(axis=1)
+        val_2028 = self.val_2028 * params["target_2028_factor"][:, self.sector_rows, :, np.newaxis]
+        trajectory = ID19.project_sectors(self.val_2024, val_2028, total_pelts, YEARS)
+        parts = [
+            trajectory.reshape(n_draws, -1, len(YEARS)),
+            ID19.ratio_of_jobs_to_value(trajectory),
+        ]
+        if "Farming" in self.sectors:
+            species_pelts = np.matmul(self.species_selection, block)
+            species_values, allocated_costs = ID19.split_farming(
+                trajectory[:, self.sectors.index("Farming")], total_pelts, species_pelts,
+                self.operating_costs * params["operating_cost_factor"]
+            )
+            parts += [
+                species_values.reshape(n_draws, -1, len(YEARS)),
+                ID19.ratio_of_jobs_to_value(species_values),
+                allocated_costs,
+            ]
+        return np.concatenate(parts, axis=1)
+
+    # --- ID25 - ID27 ---
+    def _prepare_impacts(self, indicator, df):
+        target_sectors = importlib.import_module(f"indicators.{indicator}").TARGET_SECTORS
+        df_baseline = impact_baseline(df, target_sectors)
+        # EU pelts of 2024 are historical, so a zero total rules the indicator out for every draw
+        if df_baseline.empty or self.history[pelts.BASE_YEAR].sum() == 0:
+            return
+        self.impacts[indicator] = pd.to_numeric(df_baseline["Value"], errors="coerce").to_numpy(dtype=float)
+        self.series[indicator] = pd.DataFrame({
+            "Country": "European Union",
+            "Species": "All Species",
+            "Fur Industry Sector": df_baseline["Fur Industry Sector"].to_numpy(),
+            "Environmental Metric": df_baseline["Environmental Metric"].to_numpy(),
+            "Metric Unit": df_baseline["Metric Unit"].to_numpy(),
+            "Variable": "Value",
+        })
+
+    def _project_impacts(self, val_2024, block):
+        # EU pelts from the "All Species" rows (see impact_scaling.eu_pelt_series)
+        eu_pelts = block[:, self.n_groups:].sum(axis=1)
+        impact_per_pelt = val_2024 / eu_pelts[:, YEARS == 2024]
+        return impact_per_pelt[:, :, np.newaxis] * eu_pelts[:, np.newaxis, :]
+
+    def evaluate(self, params):
+        """[draw × series × year] projection of every indicator for a batch of draws"""
+        results = {}
+        if self.history is None:
+            return results
+        block = self._project_pelts(params)
+        results[PELTS_SHEET] = block
+        if FARMS_SHEET in self.series:
+            farms = self._project_farms(block)
+            results[FARMS_SHEET] = farms
+            if "ID28" in self.series:
+                results["ID28"] = self._project_land(farms)
+        if "ID19" in self.series:
+            results["ID19"] = self._project_economics(block, params)
+        for indicator, val_2024 in self.impacts.items():
+            results[indicator] = self._project_impacts(val_2024, block)
+        return results
+
+
+# ---------------------------------------------------------
+# BANDS
+# ---------------------------------------------------------
+def percentile_bands(series, draws, percentiles=PERCENTILES):
+    """
+    Long DataFrame of percentile bands: the series keys, "Year" and one
+    column per percentile (P5, P50, ...) over the draws of every series and year.
+    """
+    bands = np.percentile(draws, percentiles, axis=0)
+    df = series.loc[series.index.repeat(len(YEARS))].reset_index(drop=True)
+    df["Year"] = np.tile(YEARS, len(series))
+    for p, band in zip(percentiles, bands):
+        df[f"P{p:g}"] = band.ravel()
+    return df
+
+
+def run_sensitivity(input_store, n_draws, indicators=SENSITIVITY_INDICATORS, seed=None,
+                    percentiles=PERCENTILES, chunk_size=CHUNK_SIZE, dtype=np.float32):
+    """
+    Percentile bands of the S1 projections over n_draws sampled parameter sets.
+
+    Draws are evaluated chunk_size at a time; the draws of every output series
+    are kept as dtype until the bands are computed (n_draws × series × years values).
+
+    Returns:
+        dict: Band DataFrame per indicator (see percentile_bands).
+    """
+    model = SensitivityModel(input_store, indicators)
+    params = sample_parameters(n_draws, seed)
+    draws = {
+        indicator: np.empty((n_draws, len(series), len(YEARS)), dtype=dtype)
+        for indicator, series in model.series.items()
+        if indicator in indicators
+    }
+
+    for start in range(0, n_draws, chunk_size):
+        chunk = slice(start, min(start + chunk_size, n_draws))
+        for indicator, values in model.evaluate(take_draws(params, chunk)).items():
+            if indicator in draws:
+                draws[indicator][chunk] = values
+
+    bands = {}
+    for indicator, values in draws.items():
+        bands[indicator] = percentile_bands(model.series[indicator], values, percentiles)
+        print(f"[INFO] Sensitivity bands for {indicator} ({len(model.series[indicator])} series, {n_draws} draws)")
+    return bands
+
+
+def write_bands(bands, output_file, ranges=PARAMETER_RANGES):
+    """Write the bands (one sheet per indicator) and the sampling ranges to an Excel file"""
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(output_file) as writer:
+        pd.DataFrame(
+            [(name, low, high) for name, (low, high) in ranges.items()],
+            columns=["Parameter", "Low", "High"]
+        ).to_excel(writer, sheet_name="parameters", index=False)
+        for indicator, df in bands.items():
+            df.to_excel(writer, sheet_name=indicator, index=False)
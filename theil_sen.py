@@ -0,0 +1,123 @@
+"""
+Batched Theil-Sen estimator for many small univariate regressions.
+
+Reproduces sklearn.linear_model.TheilSenRegressor (fit_intercept=True, all
+sample pairs enumerated) for every group at once: the (intercept, slope) line
+through each pair of points is computed in one vectorized pass over padded
+arrays, and the spatial median of those lines is found with the same modified
+Weiszfeld iteration, run for all groups together.
+"""
+
+import warnings
+
+import numpy as np
+
+_EPSILON = np.finfo(np.double).eps
+
+
+def pairwise_lines(x, y, mask):
+    """Computes the line through every pair of valid points of each group.
+
+    Args:
+        x (np.ndarray): Sample positions of shape (n_points,), shared by all groups.
+        y (np.ndarray): Values of shape (n_groups, n_points).
+        mask (np.ndarray): Boolean array of shape (n_groups, n_points); False marks padding.
+
+    Returns:
+        tuple: (lines, valid) where lines has shape (n_groups, n_pairs, 2) holding
+            [intercept, slope] per pair and valid flags the pairs of two valid points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    first, second = np.triu_indices(x.shape[0], k=1)
+
+    slopes = (y[:, second] - y[:, first]) / (x[second] - x[first])
+    intercepts = y[:, first] - slopes * x[first]
+    valid = mask[:, first] & mask[:, second]
+
+    lines = np.stack([intercepts, slopes], axis=-1)
+    lines[~valid] = 0.0
+    return lines, valid
+
+
+def batched_spatial_median(points, valid, max_iter=300, tol=1.0e-3):
+    """Spatial (L1) median of a padded batch of 2-D point sets.
+
+    Each group iterates until its own convergence criterion is met, exactly as
+    sklearn's _spatial_median does for a single point set.
+
+    Args:
+        points (np.ndarray): Array of shape (n_groups, n_points, 2).
+        valid (np.ndarray): Boolean array of shape (n_groups, n_points).
+        max_iter (int): Maximum number of Weiszfeld iterations.
+        tol (float): Stop once the update of a group's median is below tol.
+
+    Returns:
+        np.ndarray: Medians of shape (n_groups, 2); NaN for groups without points.
+    """
+    n_valid = valid.sum(axis=1)
+    weights = valid[..., np.newaxis]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        median = (points * weights).sum(axis=1) / n_valid[:, np.newaxis]
+
+    tol **= 2  # compared with the squared norm of the update
+    active = n_valid > 0
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+
+        pts = points[active]
+        old = median[active]
+        diff = pts - old[:, np.newaxis, :]
+        diff_norm = np.sqrt(np.sum(diff ** 2, axis=2))
+        use = valid[active] & (diff_norm >= _EPSILON)
+        # The current estimate coincides with one of the points
+        is_old_in_points = (use.sum(axis=1) < n_valid[active]).astype(float)
+
+        inv_norm = np.where(use, 1.0 / np.where(use, diff_norm, 1.0), 0.0)
+        quotient_norm = np.linalg.norm((diff * inv_norm[..., np.newaxis]).sum(axis=1), axis=1)
+        has_direction = quotient_norm > _EPSILON
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            new_direction = (pts * inv_norm[..., np.newaxis]).sum(axis=1) / inv_norm.sum(axis=1)[:, np.newaxis]
+        new_direction = np.where(has_direction[:, np.newaxis], new_direction, 1.0)
+        quotient_norm = np.where(has_direction, quotient_norm, 1.0)
+
+        ratio = (is_old_in_points / quotient_norm)[:, np.newaxis]
+        new = np.maximum(0.0, 1.0 - ratio) * new_direction + np.minimum(1.0, ratio) * old
+
+        median[active] = new
+        converged = np.sum((old - new) ** 2, axis=1) < tol
+        active_idx = np.flatnonzero(active)
+        active[active_idx[converged]] = False
+    else:
+        if active.any():
+            warnings.warn(
+                f"Maximum number of iterations {max_iter} reached in spatial median "
+                f"for {int(active.sum())} Theil-Sen fit(s).",
+                RuntimeWarning,
+            )
+
+    return median
+
+
+def batched_theil_sen(x, y, mask, max_iter=300, tol=1.0e-3):
+    """Fits a Theil-Sen line y = intercept + slope * x to every group.
+
+    Args:
+        x (np.ndarray): Sample positions of shape (n_points,), shared by all groups.
+        y (np.ndarray): Values of shape (n_groups, n_points).
+        mask (np.ndarray): Boolean array of shape (n_groups, n_points) marking the
+            samples used by each group's fit.
+        max_iter (int): Maximum number of Weiszfeld iterations.
+        tol (float): Convergence tolerance of the spatial median.
+
+    Returns:
+        tuple: (intercepts, slopes), each of shape (n_groups,). Groups with fewer
+            than two samples get NaN.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    lines, valid = pairwise_lines(x, np.where(mask, y, 0.0), mask)
+    median = batched_spatial_median(lines, valid, max_iter=max_iter, tol=tol)
+    return median[:, 0], median[:, 1]
@@ -0,0 +1,95 @@
+"""
+Shared categorical vocabulary of the key columns.
+
+Country, Species, Fur Industry Sector, Environmental Metric and Metric Unit
+repeat the same few strings on every row of the input sheets and
+projections. InputStore builds one Vocabulary per run from the loaded
+sheets and stores every key column as a pandas Categorical with its dtype,
+and scheduler.run_indicator_projection applies it to each projection. All
+frames of a run then share the same dtype per column, so filters such as
+df["Country"] == ms compare integer codes, and key columns take a fraction
+of the memory of object strings.
+
+Categories are the known values below plus every value found in the input
+workbook, in lexical order: sorting, groupby and pivot order are the same
+as for plain strings. Columns holding non-string values are left as they
+are, and a value missing from the vocabulary extends the dtype of its frame
+rather than being lost.
+"""
+
+import pandas as pd
+
+KEY_COLUMNS = ["Country", "Species", "Fur Industry Sector", "Environmental Metric", "Metric Unit"]
+
+# Values known before any input is read (constants of the indicator modules)
+BASE_VALUES = {
+    "Country": [
+        "European Union",
+        "Austria", "Belgium", "Bulgaria", "Croatia", "Cyprus", "Czechia", "Denmark",
+        "Estonia", "Finland", "France", "Germany", "Greece", "Hungary", "Ireland",
+        "Italy", "Latvia", "Lithuania", "Luxembourg", "Malta", "Netherlands",
+        "Poland", "Portugal", "Romania", "Slovakia", "Slovenia", "Spain", "Sweden"
+    ],
+    "Species": ["All Species", "Mink", "Fox", "Raccoon dog", "Chinchilla"],
+    "Fur Industry Sector": [
+        "Feed", "Other farm inputs", "Farming", "Auction, agency", "Tanning, dressing, dyeing",
+        "Product manufacturing", "Wholesale", "Retail sale"
+    ],
+    "Environmental Metric": ["Agricultural land occupation"],
+    "Metric Unit": ["km2"],
+}
+
+
+def _string_values(series):
+    """Distinct non-null values of a column, or None if any of them is not a string"""
+    values = series.dropna().unique()
+    if not all(isinstance(value, str) for value in values):
+        return None
+    return set(values)
+
+
+class Vocabulary:
+    """Categorical dtype of every key column"""
+
+    def __init__(self, values=None):
+        values = values if values is not None else BASE_VALUES
+        self.dtypes = {
+            col: pd.CategoricalDtype(sorted(set(values.get(col, ())) | set(BASE_VALUES.get(col, ()))))
+            for col in KEY_COLUMNS
+        }
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Vocabulary of the base values and every key value of the given frames"""
+        values = {col: set(BASE_VALUES[col]) for col in KEY_COLUMNS}
+        for df in frames:
+            for col in KEY_COLUMNS:
+                if col in df.columns:
+                    found = _string_values(df[col])
+                    if found:
+                        values[col] |= found
+        return cls(values)
+
+    def apply(self, df):
+        """df with its key columns (those holding strings only) as shared Categoricals"""
+        converted = {}
+        for col in KEY_COLUMNS:
+            if col not in df.columns:
+                continue
+            dtype = self.dtypes[col]
+            if df[col].dtype == dtype:
+                continue
+            found = _string_values(df[col])
+            if found is None:
+                continue
+            unknown = found.difference(dtype.categories)
+            if unknown:
+                dtype = pd.CategoricalDtype(sorted(set(dtype.categories) | unknown))
+            converted[col] = df[col].astype(object).astype(dtype)
+        return df.assign(**converted) if converted else df
+
+
+def categorize(frames):
+    """(vocabulary, frames) with the key columns of a {name: DataFrame} dict as shared Categoricals"""
+    vocabulary = Vocabulary.from_frames(frames.values())
+    return vocabulary, {name: vocabulary.apply(df) for name, df in frames.items()}
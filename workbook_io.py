@@ -0,0 +1,406 @@
+"""
+Workbook input/output helpers shared by main.py.
+
+- InputStore: opens input.xlsx once per run and keeps the parsed sheets in memory.
+  With a cache folder, every parsed sheet is also stored as a Feather file keyed
+  by the content of its worksheet, so later runs skip the Excel parser.
+  Key columns are stored as Categoricals of a shared Vocabulary (vocabulary.py).
+- ProjectionWriter: buffers projections and the projection log, and writes
+  projected_data.xlsx once (atomically) at the end of the run.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # the input cache is disabled without pyarrow
+    pa = None
+    feather = None
+
+from vocabulary import Vocabulary, categorize
+from zero_runs import expand_zero_runs
+
+CACHE_MANIFEST = "manifest.json"
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _sheet_key(*parts):
+    """Cache key of one sheet: the sheet name, the content it was parsed from and the pandas version"""
+    h = hashlib.sha256(pd.__version__.encode())
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+    return h.hexdigest()
+
+
+def _referenced_parts(sheet_xml):
+    """Indices of the shared strings and ids of the cell styles (cellXfs) that a worksheet references"""
+    strings, styles = set(), set()
+    for element in ElementTree.fromstring(sheet_xml).iter():
+        if element.tag == f"{_NS_MAIN}c":
+            if element.get("t") == "s":
+                value = element.find(f"{_NS_MAIN}v")
+                if value is not None and value.text:
+                    strings.add(int(value.text))
+            style = element.get("s")
+        elif element.tag == f"{_NS_MAIN}row":
+            style = element.get("s")
+        elif element.tag == f"{_NS_MAIN}col":
+            style = element.get("style")
+        else:
+            continue
+        if style is not None:
+            styles.add(int(style))
+    return strings, styles
+
+
+def _style_entries(styles_xml):
+    """Serialized cellXfs entries, each with the custom number format it uses (what the parser reads from a style)"""
+    if styles_xml is None:
+        return []
+    root = ElementTree.fromstring(styles_xml)
+    formats = {fmt.get("numFmtId"): ElementTree.tostring(fmt) for fmt in root.iter(f"{_NS_MAIN}numFmt")}
+    cell_xfs = root.find(f"{_NS_MAIN}cellXfs")
+    if cell_xfs is None:
+        return []
+    return [ElementTree.tostring(xf) + formats.get(xf.get("numFmtId"), b"") for xf in cell_xfs]
+
+
+def sheet_fingerprints(input_file):
+    """
+    Cache key of every sheet of an .xlsx workbook, from the XML part of the
+    worksheet plus the shared strings and cell styles that this part
+    references, so editing one sheet (including its text cells) only changes
+    that sheet's key. Strings or styles added for other sheets do not change
+    it either, as long as the indices this sheet uses still point to the same
+    entries (Excel may renumber them when it re-saves a workbook).
+    Returns None if the workbook cannot be read as an Office Open XML package.
+    """
+    try:
+        with zipfile.ZipFile(input_file) as zf:
+            names = set(zf.namelist())
+            strings = []
+            if "xl/sharedStrings.xml" in names:
+                shared = ElementTree.fromstring(zf.read("xl/sharedStrings.xml"))
+                strings = [ElementTree.tostring(si) for si in shared.iter(f"{_NS_MAIN}si")]
+            styles = _style_entries(zf.read("xl/styles.xml") if "xl/styles.xml" in names else None)
+            rels = ElementTree.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+            targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+            workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+
+            keys = {}
+            for sheet in workbook.iter(f"{_NS_MAIN}sheet"):
+                target = targets[sheet.get(f"{_NS_REL}id")]
+                part = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+                sheet_xml = zf.read(part)
+                used_strings, used_styles = _referenced_parts(sheet_xml)
+                # An index without an entry is keyed as missing (the parser then fails or falls back the same way)
+                referenced = [b"s%d:" % i + (strings[i] if i < len(strings) else b"") for i in sorted(used_strings)]
+                referenced += [b"x%d:" % i + (styles[i] if i < len(styles) else b"") for i in sorted(used_styles)]
+                keys[sheet.get("name")] = _sheet_key(sheet.get("name"), sheet_xml, *referenced)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, ElementTree.ParseError):
+        return None
+    return keys or None
+
+
+def _restore_missing(df):
+    """Arrow returns None for missing strings; the Excel parser gives NaN"""
+    for col in df.columns[df.dtypes == object]:
+        if df[col].isna().any():
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+class InputStore:
+    """
+    In-memory store of input sheets.
+
+    The workbook is opened a single time in load(); only the requested sheets
+    are parsed, and each indicator then reads its frame from memory.
+
+    With a cache_dir, load() first looks for a Feather copy of each sheet,
+    keyed by the workbook hash and, when the workbook changed, by the content
+    of the sheet itself; only the sheets without a valid copy are parsed from
+    Excel (and then cached). Sheets that do not survive an exact Arrow round
+    trip (e.g. mixed-type or non-string columns) are always parsed from Excel.
+
+    After loading, the key columns of all sheets are converted to the
+    Categoricals of self.vocabulary, built from the sheets loaded so far.
+    """
+
+    def __init__(self, input_file, cache_dir=None):
+        self.input_file = input_file
+        self.cache_dir = cache_dir if feather is not None else None
+        self.frames = {}
+        self.parse_times = {}
+        self.vocabulary = Vocabulary()
+        if cache_dir is not None and feather is None:
+            print("[WARNING] pyarrow is not installed, input cache disabled")
+
+    def load(self, sheets):
+        """Load the requested sheets (those present in the workbook), from the cache where possible"""
+        if not self.input_file.exists():
+            print(f"[WARNING] Input file {self.input_file} not found")
+            return self
+
+        sheets = [sheet for sheet in sheets if sheet not in self.frames]
+        if self.cache_dir is None:
+            self._parse(sheets)
+            self._apply_vocabulary()
+            return self
+
+        manifest = self._cache_manifest()
+        to_parse = []
+        for sheet in sheets:
+            key = manifest["sheets"].get(sheet)
+            if key is None:
+                if manifest["complete"]:
+                    continue  # not a sheet of this workbook
+                key = manifest["sheets"][sheet] = _sheet_key(sheet, manifest["workbook"])
+            if not self._read_cached(sheet, key):
+                to_parse.append(sheet)
+
+        for sheet in self._parse(to_parse):
+            self._write_cached(sheet, manifest["sheets"][sheet])
+
+        self._save_cache_manifest(manifest)
+        self._apply_vocabulary()
+        return self
+
+    def _apply_vocabulary(self):
+        """Rebuild the vocabulary from all loaded sheets and convert their key columns"""
+        self.vocabulary, self.frames = categorize(self.frames)
+
+    def get(self, sheet):
+        """Return a copy of one parsed sheet, or None if it was not loaded"""
+        if sheet not in self.frames:
+            return None
+        return self.frames[sheet].copy()
+
+    # ---------------------------------------------------------
+    # Excel parsing
+    # ---------------------------------------------------------
+    def _parse(self, sheets):
+        """Parse sheets from the workbook in one pass; returns the sheets found"""
+        if not sheets:
+            return []
+
+        parsed = []
+        with pd.ExcelFile(self.input_file) as xls:
+            for sheet in sheets:
+                if sheet not in xls.sheet_names:
+                    continue
+                start = time.perf_counter()
+                self.frames[sheet] = xls.parse(sheet)
+                self.parse_times[sheet] = time.perf_counter() - start
+                print(f"[INFO] Parsed input sheet {sheet} in {self.parse_times[sheet]:.3f}s")
+                parsed.append(sheet)
+        return parsed
+
+    # ---------------------------------------------------------
+    # Columnar cache
+    # ---------------------------------------------------------
+    def _cache_manifest(self):
+        """
+        Sheet keys of the current workbook. The previous manifest is reused
+        as long as the workbook hash is unchanged; otherwise the keys are
+        recomputed per worksheet, so unchanged sheets keep their cached copy.
+        """
+        workbook_hash = file_sha256(self.input_file)
+        manifest_file = self.cache_dir / CACHE_MANIFEST
+        if manifest_file.exists():
+            try:
+                manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+                if manifest.get("workbook") == workbook_hash:
+                    return manifest
+            except (OSError, ValueError):
+                pass
+
+        keys = sheet_fingerprints(self.input_file)
+        return {"workbook": workbook_hash, "complete": keys is not None, "sheets": keys or {}}
+
+    def _save_cache_manifest(self, manifest):
+        """Write the manifest and remove cached sheets of earlier workbook versions"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.cache_dir / CACHE_MANIFEST, json.dumps(manifest, indent=2, sort_keys=True))
+
+        current = set(manifest["sheets"].values())
+        for path in self.cache_dir.glob("*.feather"):
+            if path.stem not in current:
+                path.unlink()
+
+    def _read_cached(self, sheet, key):
+        """
+        Load one sheet from its Feather copy; False if there is none.
+        The file is memory-mapped for reading, but to_pandas() copies the
+        columns into the frame, so the frame does not keep the file open.
+        """
+        path = self.cache_dir / f"{key}.feather"
+        if not path.exists():
+            return False
+
+        start = time.perf_counter()
+        try:
+            df = feather.read_table(path, memory_map=True).to_pandas()
+        except (OSError, pa.ArrowException):
+            return False
+        self.frames[sheet] = _restore_missing(df)
+        self.parse_times[sheet] = time.perf_counter() - start
+        print(f"[INFO] Loaded input sheet {sheet} from cache in {self.parse_times[sheet]:.3f}s")
+        return True
+
+    def _write_cached(self, sheet, key):
+        """Store a parsed sheet as Feather if it reads back identical"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.feather"
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=".sheet.", suffix=".feather")
+        os.close(fd)
+
+        df = self.frames[sheet]
+        try:
+            feather.write_feather(df, tmp_name)
+            back = _restore_missing(feather.read_table(tmp_name).to_pandas())
+            if df.dtypes.equals(back.dtypes) and df.columns.equals(back.columns) and df.equals(back):
+                os.replace(tmp_name, path)
+            else:
+                print(f"[INFO] Input sheet {sheet} does not round-trip through Feather, not cached")
+        except (ValueError, TypeError, pa.ArrowException):
+            print(f"[INFO] Input sheet {sheet} cannot be stored as Feather, not cached")
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+
+def atomic_write_text(path, text):
+    """Write a text file through a temporary file renamed into place"""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def _order_sheets(book, rank):
+    """Sort the sheets of an openpyxl workbook that are in rank within the positions they hold"""
+    names = book.sheetnames
+    slots = [i for i, name in enumerate(names) if name in rank]
+    for slot, name in zip(slots, sorted((names[i] for i in slots), key=rank.get)):
+        book.move_sheet(name, offset=slot - book.sheetnames.index(name))
+
+
+class ProjectionWriter:
+    """
+    Write-behind output stage for projected_data.xlsx.
+
+    Finished projections and the projection log are collected in memory and
+    written in a single pass by flush(). With checkpoint_every=N the buffer is
+    also flushed after every N indicators, so a crashed run keeps its progress.
+
+    Every flush writes to a temporary file next to the workbook and renames it
+    into place, so a killed run never leaves a half-written workbook behind.
+    Sheets already in the workbook that were not produced in this run are kept.
+    Projections stored with zero runs (zero_runs.py) are written as dense rows.
+
+    A new workbook starts with projection_log, followed by the projections in
+    sheet_order (the configured indicator order), whatever order they
+    finished in, also across checkpoints: the sheets of sheet_order are
+    sorted within the positions they hold. Other sheets keep their position.
+    """
+
+    def __init__(self, output_file, checkpoint_every=None, sheet_order=None):
+        self.output_file = output_file
+        self.checkpoint_every = checkpoint_every
+        self.sheet_order = list(sheet_order or [])
+        self.pending = {}
+        self.projection_log = None
+        self._log_changed = False
+        self._added_since_flush = 0
+        # Seconds spent serialising each sheet, and in flush() overall
+        self.write_times = {}
+        self.flush_time = 0.0
+
+    def add(self, sheet, df):
+        """Buffer one indicator's projection"""
+        self.pending[sheet] = df
+        self._added_since_flush += 1
+
+        if self.checkpoint_every and self._added_since_flush >= self.checkpoint_every:
+            self.flush()
+
+    def set_log(self, projection_log):
+        """Buffer the latest projection log"""
+        self.projection_log = projection_log
+        self._log_changed = True
+
+    def flush(self):
+        """Atomically write all buffered sheets and the log to the workbook"""
+        if not self.pending and not self._log_changed:
+            return
+
+        start = time.perf_counter()
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(
+            dir=self.output_file.parent, prefix=f".{self.output_file.stem}.", suffix=".xlsx"
+        )
+        os.close(fd)
+
+        try:
+            if self.output_file.exists():
+                # Start from the existing workbook so sheets from earlier runs survive
+                shutil.copyfile(self.output_file, tmp_name)
+                writer_kwargs = {"mode": "a", "if_sheet_exists": "replace"}
+            else:
+                writer_kwargs = {"mode": "w"}
+
+            # Configured order first, then any other sheet in the order it was added
+            rank = {sheet: i for i, sheet in enumerate(self.sheet_order)}
+            pending = sorted(self.pending, key=lambda sheet: rank.get(sheet, len(rank)))
+            with pd.ExcelWriter(tmp_name, engine="openpyxl", **writer_kwargs) as writer:
+                if self._log_changed:
+                    self.projection_log.to_excel(writer, sheet_name="projection_log", index=False)
+                for sheet in pending:
+                    df = self.pending[sheet]
+                    sheet_start = time.perf_counter()
+                    # Zero runs are written as one row per year
+                    expand_zero_runs(df).to_excel(writer, sheet_name=sheet, index=False)
+                    self.write_times[sheet] = self.write_times.get(sheet, 0.0) + time.perf_counter() - sheet_start
+                _order_sheets(writer.book, rank)
+
+            os.replace(tmp_name, self.output_file)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            raise
+
+        self.flush_time += time.perf_counter() - start
+        print(f"[INFO] Wrote {len(self.pending)} sheet(s) to {self.output_file}")
+        self.pending = {}
+        self._log_changed = False
+        self._added_since_flush = 0
+
+
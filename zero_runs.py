@@ -0,0 +1,86 @@
+"""
+Run-length storage of zero series over the year axis.
+
+After the LT/LV/RO/PL phase-outs, and for series without production in
+2024, a large share of the Country × Species × Year cells of the pelt, farm
+and ID28 projections are exactly 0. These projections store every run of
+consecutive years in which a series is 0 as the first row of the run, with
+the number of years it stands for in the RUN_LENGTH column (1 for all other
+rows). A series is a sequence of rows that differ in Year and the values
+only (Country, Species, Source, ...), in year order, as every projection
+writes them.
+
+The collapsed rows only hold zeros, so totals of a compressed frame
+(groupby().sum(), sums of the rows of a year) are those of the dense frame,
+and row-wise transforms (e.g. ID28: farms × land per farm) keep the runs:
+downstream indicators read compressed frames as they are (the farm
+projection looks up production with ProjectionCube.from_long(...,
+fill_runs=False), where the later years of a run are missing keys that
+count as 0). Dense rows are restored by expand_zero_runs() only where every
+year is needed: the Excel output (workbook_io.ProjectionWriter), the cubes of
+the figures, and readers that pivot the years into columns (e.g. the parity
+check of benchmarks/bench_sensitivity.py). RUN_LENGTH is therefore part of
+these projections in memory (registry, worker results), but not of
+projected_data.xlsx. A projection reused from the workbook is compressed
+again on the ZERO_RUN_VALUES of its module, so downstream indicators and
+fingerprints see one form whether it was generated or reused, and row
+counts (Rows Out of the run metrics) are those of the dense rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+RUN_LENGTH = "Run Length"
+YEAR = "Year"
+
+
+def _series_codes(column):
+    """Values of a column that are equal exactly for rows of the same series"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy()
+    return column.to_numpy()
+
+
+def compress_zero_runs(df, values):
+    """
+    df with each run of consecutive years in which all values columns of a
+    series are 0 collapsed into its first row, and RUN_LENGTH appended as
+    the last column. Frames that are already compressed have their adjacent
+    runs merged.
+    """
+    if YEAR not in df.columns:
+        return df
+    lengths = df[RUN_LENGTH].to_numpy(dtype=np.int64) if RUN_LENGTH in df.columns else np.ones(len(df), np.int64)
+    df = df.drop(columns=RUN_LENGTH, errors="ignore")
+    if df.empty:
+        return df.assign(**{RUN_LENGTH: lengths.astype(np.int16)})
+
+    zero = np.logical_and.reduce([pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float) == 0 for col in values])
+    years = df[YEAR].to_numpy()
+    # A row continues the run of the previous row: both 0, the next year, same series
+    continues = np.r_[False, zero[1:] & zero[:-1] & (years[1:] == years[:-1] + lengths[:-1])]
+    for col in df.columns.difference(list(values) + [YEAR]):
+        codes = _series_codes(df[col])
+        continues[1:] &= codes[1:] == codes[:-1]
+
+    starts = np.flatnonzero(~continues)
+    compressed = df.iloc[starts].reset_index(drop=True)
+    # A run covers a few decades at most
+    compressed[RUN_LENGTH] = np.add.reduceat(lengths, starts).astype(np.int16)
+    return compressed
+
+
+def expand_zero_runs(df):
+    """Dense rows of a compressed frame (one row per year, without RUN_LENGTH); other frames as they are"""
+    if RUN_LENGTH not in df.columns:
+        return df
+    lengths = df[RUN_LENGTH].to_numpy(dtype=np.int64)
+    dense = df.drop(columns=RUN_LENGTH)
+    if (lengths == 1).all():
+        return dense
+
+    rows = np.repeat(np.arange(len(dense)), lengths)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    dense = dense.iloc[rows].reset_index(drop=True)
+    dense[YEAR] = dense[YEAR].to_numpy() + offsets
+    return dense